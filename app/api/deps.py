@@ -1,14 +1,11 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Generator
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from pydantic import ValidationError
-from sqlalchemy.orm import Session
 
 from app.db.base import SessionLocal
 from app.core.config import settings
 from app.models.domain.user import User
-from app.models.schemas.token import TokenPayload
+from app.utils.permissions import UserNotFoundError, load_principal_user, resolve_principal
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login",
@@ -23,43 +20,36 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db),
+async def get_current_user(
+    request: Request,
     token: str = Depends(reusable_oauth2)
 ) -> User:
     """获取当前用户
     
+    复用请求级的身份解析结果，同一请求内令牌只解码一次、数据库最多查询一次。
+    无论身份来自令牌中的权限声明还是数据库，用户不存在时都返回 404
+    
     Args:
-        db: 数据库会话
+        request: 当前请求
         token: JWT令牌
         
     Returns:
         User: 当前用户对象
         
     Raises:
-        HTTPException: 令牌无效或用户不存在时抛出
+        HTTPException: 令牌无效时抛出 401，用户不存在时抛出 404
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无效的认证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
+    user_not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="用户不存在"
     )
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-        if token_data.sub is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == token_data.sub).first()
+        principal = await resolve_principal(request, token)
+    except UserNotFoundError:
+        raise user_not_found
+    user = await load_principal_user(request, principal)
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在"
-        )
+        raise user_not_found
     return user
 
 def get_current_active_user(
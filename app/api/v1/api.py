@@ -1,6 +1,8 @@
-from fastapi import APIRouter
-from app.api.v1.endpoints import auth, roles
+from fastapi import APIRouter, Depends
+from app.api.v1.endpoints import auth, roles, system
+from app.utils.quota import rbac_quota
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(roles.router, prefix="/rbac", tags=["rbac"]) 
\ No newline at end of file
+api_router.include_router(roles.router, prefix="/rbac", tags=["rbac"], dependencies=[Depends(rbac_quota)])
+api_router.include_router(system.router, prefix="/system", tags=["system"])
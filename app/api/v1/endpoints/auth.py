@@ -1,27 +1,42 @@
 from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app.core.config import settings
+from app.db.base import get_async_db
 from app.models.domain.user import User
 from app.models.schemas.user import User as UserSchema, UserCreate
 from app.models.schemas.token import Token, LoginRequest
 from app.models.schemas.common import ResponseModel, ErrorCode
 from app.models.schemas.messages import ErrorMessages, SuccessMessages
 from app.utils.security import create_access_token
+from app.utils.permissions import build_permission_claims
+from app.utils.rate_limit import per_body_field, per_ip, rate_limit
 from app.services.user_service import UserService
 from app.core.exceptions import APIException
 
 router = APIRouter()
 
+# 登录按客户端 IP 与用户名双维度限流，注册按客户端 IP 限流
+login_rate_limit = rate_limit(
+    "login",
+    per_ip(settings.LOGIN_RATE_LIMIT_PER_IP, settings.LOGIN_RATE_LIMIT_WINDOW),
+    per_body_field("username", settings.LOGIN_RATE_LIMIT_PER_USERNAME, settings.LOGIN_RATE_LIMIT_WINDOW),
+)
+register_rate_limit = rate_limit(
+    "register",
+    per_ip(settings.REGISTER_RATE_LIMIT_PER_IP, settings.REGISTER_RATE_LIMIT_WINDOW),
+)
+
 @router.post(
     "/login",
     response_model=ResponseModel[Token],
     status_code=status.HTTP_200_OK,
     summary="用户登录",
     description="使用用户名和密码登录，获取访问令牌。用于后续请求的身份验证。",
+    dependencies=[Depends(login_rate_limit)],
     responses={
         200: {
             "description": "登录成功",
@@ -61,12 +76,24 @@ router = APIRouter()
                     }
                 }
             }
+        },
+        429: {
+            "description": "请求过于频繁",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "code": ErrorCode.TOO_MANY_REQUESTS,
+                        "msg": ErrorMessages.TOO_MANY_REQUESTS,
+                        "data": {"retry_after": 12.5}
+                    }
+                }
+            }
         }
     }
 )
-def login(
+async def login(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_db),
     login_data: LoginRequest,
 ) -> ResponseModel[Token]:
     """用户登录接口
@@ -80,7 +107,7 @@ def login(
     Returns:
         ResponseModel[Token]: 标准响应，包含访问令牌信息
     """
-    user = UserService.authenticate(db, login_data.username, login_data.password)
+    user = await UserService.authenticate(db, login_data.username, login_data.password)
     if not user:
         raise APIException(
             code=ErrorCode.INVALID_CREDENTIALS,
@@ -90,7 +117,9 @@ def login(
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     token_data = {
         "access_token": create_access_token(
-            user.id, expires_delta=access_token_expires
+            user.id,
+            expires_delta=access_token_expires,
+            claims=await build_permission_claims(user)
         ),
         "token_type": "bearer"
     }
@@ -105,6 +134,7 @@ def login(
     status_code=status.HTTP_201_CREATED,
     summary="用户注册",
     description="创建新用户。用户名必须是3-20个字符，只能包含字母、数字、下划线和连字符。密码必须是6-20个字符。",
+    dependencies=[Depends(register_rate_limit)],
     responses={
         201: {
             "description": "注册成功",
@@ -132,12 +162,24 @@ def login(
                     }
                 }
             }
+        },
+        429: {
+            "description": "请求过于频繁",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "code": ErrorCode.TOO_MANY_REQUESTS,
+                        "msg": ErrorMessages.TOO_MANY_REQUESTS,
+                        "data": {"retry_after": 12.5}
+                    }
+                }
+            }
         }
     }
 )
-def register(
+async def register(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_in: UserCreate,
 ) -> ResponseModel[UserSchema]:
     """用户注册接口
@@ -151,13 +193,13 @@ def register(
     Returns:
         ResponseModel[User]: 标准响应，包含创建的用户信息
     """
-    if UserService.get_by_username(db, user_in.username):
+    if await UserService.get_by_username(db, user_in.username):
         raise APIException(
             code=ErrorCode.USER_EXISTS,
             message=ErrorMessages.USER_EXISTS
         )
     
-    user = UserService.create(db, user_in)
+    user = await UserService.create(db, user_in)
     return ResponseModel.success(
         data=user,
         msg=SuccessMessages.REGISTER_SUCCESS
@@ -198,7 +240,7 @@ def register(
             }
         },
         404: {
-            "description": "用户不存在",
+            "description": "令牌有效但用户已不存在",
             "content": {
                 "application/json": {
                     "example": {
@@ -1,46 +1,55 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.base import get_db
-from app.models.domain.user import User
-from app.models.schemas.role import Role, RoleCreate, RoleUpdate, Permission, PermissionCreate, PermissionUpdate, UserRoleAssign
-from app.models.schemas.common import ResponseModel, ErrorCode
+from typing import List, Any, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.base import get_async_db
+from app.models.schemas.role import Role, RoleCreate, RoleUpdate, Permission, PermissionCreate, PermissionUpdate, UserRoleAssign, UserRoleUpdate, UserRoleBulkAssign
+from app.models.schemas.common import ResponseModel, PageResponseModel, ErrorCode
 from app.models.schemas.messages import ErrorMessages, SuccessMessages
 from app.services.role import RoleService, PermissionService
-from app.utils.security import get_current_active_user
+from app.utils.security import Principal
 from app.utils.permissions import require_permissions, Permissions
 from app.core.exceptions import APIException
+from app.utils.pagination import decode_cursor
+from app.utils.response import page_json_response, success_json_response
 
 router = APIRouter()
 
 # 角色管理API
-@router.get("/roles", response_model=ResponseModel[List[Role]], summary="获取所有角色")
+@router.get("/roles", response_model=PageResponseModel[List[Role]], summary="获取所有角色")
 async def get_roles(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.ROLE_READ]))
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.ROLE_READ]))
 ):
     """
     获取所有角色列表
+    
+    按ID顺序游标分页：用响应中的 next_cursor 作为 cursor 参数获取下一页，为 null 时已是最后一页。
+    仍支持 skip 偏移分页（未传 cursor 且 skip 大于 0 时使用），此时 next_cursor 为 null
     """
-    roles = await RoleService.get_roles(db, skip=skip, limit=limit)
-    return ResponseModel.success(data=roles)
+    if cursor is None and skip > 0:
+        roles_json = await RoleService.get_roles_json(db, skip=skip, limit=limit)
+        return page_json_response(roles_json, None)
+    roles_json, next_cursor = await RoleService.get_roles_page_json(db, after_id=decode_cursor(cursor), limit=limit)
+    return page_json_response(roles_json, next_cursor)
 
 
 @router.get("/roles/{role_id}", response_model=ResponseModel[Role], summary="获取角色详情")
 async def get_role(
     role_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.ROLE_READ]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.ROLE_READ]))
 ):
     """
     根据ID获取角色详情
     """
-    role = await RoleService.get_role(db, role_id=role_id)
-    if role is None:
+    role_json = await RoleService.get_role_json(db, role_id=role_id)
+    if role_json is None:
         raise APIException(code=ErrorCode.ROLE_NOT_FOUND, message=ErrorMessages.ROLE_NOT_FOUND)
-    return ResponseModel.success(data=role)
+    return success_json_response(role_json)
 
 
 @router.post("/roles", 
@@ -93,8 +102,8 @@ async def get_role(
 )
 async def create_role(
     role_create: RoleCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.ROLE_CREATE]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.ROLE_CREATE]))
 ):
     """
     创建新角色
@@ -118,8 +127,8 @@ async def create_role(
 async def update_role(
     role_id: int,
     role_update: RoleUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.ROLE_UPDATE]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.ROLE_UPDATE]))
 ):
     """
     更新角色信息
@@ -133,12 +142,22 @@ async def update_role(
 @router.delete("/roles/{role_id}", response_model=ResponseModel[dict], status_code=status.HTTP_200_OK, summary="删除角色")
 async def delete_role(
     role_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.ROLE_DELETE]))
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.ROLE_DELETE]))
 ):
     """
     删除角色
+    
+    拥有该角色的用户数超过 RBAC_DELETE_BACKGROUND_THRESHOLD 时，转为后台分批删除
     """
+    threshold = settings.RBAC_DELETE_BACKGROUND_THRESHOLD
+    if threshold and await RoleService.count_role_users(db, role_id) > threshold:
+        if await RoleService.get_role(db, role_id=role_id) is None:
+            raise APIException(code=ErrorCode.ROLE_NOT_FOUND, message=ErrorMessages.ROLE_NOT_FOUND)
+        background_tasks.add_task(RoleService.delete_role_in_chunks, role_id)
+        return ResponseModel.success(data={"status": "scheduled"}, msg=SuccessMessages.ROLE_DELETE_SCHEDULED)
+    
     result = await RoleService.delete_role(db=db, role_id=role_id)
     if not result:
         raise APIException(code=ErrorCode.ROLE_NOT_FOUND, message=ErrorMessages.ROLE_NOT_FOUND)
@@ -149,46 +168,134 @@ async def delete_role(
 async def assign_user_roles(
     user_id: int,
     role_assign: UserRoleAssign,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.USER_UPDATE, Permissions.ROLE_UPDATE]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.USER_UPDATE, Permissions.ROLE_UPDATE]))
 ):
     """
     为用户分配角色
     """
-    user = await RoleService.assign_user_roles(db=db, user_id=user_id, role_ids=role_assign.role_ids)
-    if user is None:
+    result = await RoleService.assign_user_roles(db=db, user_id=user_id, role_ids=role_assign.role_ids)
+    if result is None:
         raise APIException(code=ErrorCode.USER_NOT_FOUND, message=ErrorMessages.USER_NOT_FOUND)
     return ResponseModel.success(data={"status": "success"}, msg=SuccessMessages.ROLE_ASSIGN_SUCCESS)
 
 
+@router.post("/users/roles/bulk", response_model=ResponseModel[dict], summary="批量为用户分配角色")
+async def bulk_assign_user_roles(
+    bulk_assign: UserRoleBulkAssign,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.USER_UPDATE, Permissions.ROLE_UPDATE]))
+):
+    """
+    批量为用户添加角色，可按用户列出角色（assignments），也可按角色列出用户（role_users）；
+    已拥有的角色忽略
+    """
+    pairs = {(item.user_id, role_id) for item in bulk_assign.assignments for role_id in item.role_ids}
+    pairs.update((user_id, item.role_id) for item in bulk_assign.role_users for user_id in item.user_ids)
+    if len(pairs) > settings.RBAC_BULK_MAX_PAIRS:
+        raise APIException(
+            code=ErrorCode.PARAM_ERROR,
+            message=ErrorMessages.TOO_MANY_ITEMS,
+            data={"max_pairs": settings.RBAC_BULK_MAX_PAIRS}
+        )
+    
+    result = await RoleService.bulk_assign_user_roles(db=db, pairs=pairs)
+    if result is None:
+        raise APIException(code=ErrorCode.SYSTEM_ERROR, message=ErrorMessages.DATABASE_ERROR)
+    if result["missing_users"]:
+        raise APIException(code=ErrorCode.USER_NOT_FOUND, message=ErrorMessages.USER_NOT_FOUND, data={"user_ids": result["missing_users"]})
+    if result["missing_roles"]:
+        raise APIException(code=ErrorCode.ROLE_NOT_FOUND, message=ErrorMessages.ROLE_NOT_FOUND, data={"role_ids": result["missing_roles"]})
+    return ResponseModel.success(data={"added": result["added"], "users": result["users"]}, msg=SuccessMessages.ROLE_BULK_ASSIGN_SUCCESS)
+
+
+async def _update_user_roles(db: AsyncSession, user_id: int, add: List[int], remove: List[int]) -> dict:
+    """增量调整用户角色，用户或角色不存在时抛出异常"""
+    result = await RoleService.update_user_roles(db=db, user_id=user_id, add=add, remove=remove)
+    if result is None:
+        raise APIException(code=ErrorCode.USER_NOT_FOUND, message=ErrorMessages.USER_NOT_FOUND)
+    if result["missing"]:
+        raise APIException(code=ErrorCode.ROLE_NOT_FOUND, message=ErrorMessages.ROLE_NOT_FOUND, data={"role_ids": result["missing"]})
+    return {"added": result["added"], "removed": result["removed"]}
+
+
+@router.post("/users/{user_id}/roles/{role_id}", response_model=ResponseModel[dict], summary="为用户添加角色")
+async def add_user_role(
+    user_id: int,
+    role_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.USER_UPDATE, Permissions.ROLE_UPDATE]))
+):
+    """
+    为用户添加单个角色，已拥有时不做修改
+    """
+    data = await _update_user_roles(db, user_id, add=[role_id], remove=[])
+    return ResponseModel.success(data=data, msg=SuccessMessages.ROLE_ASSIGN_SUCCESS)
+
+
+@router.delete("/users/{user_id}/roles/{role_id}", response_model=ResponseModel[dict], summary="移除用户角色")
+async def remove_user_role(
+    user_id: int,
+    role_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.USER_UPDATE, Permissions.ROLE_UPDATE]))
+):
+    """
+    移除用户的单个角色，未拥有时不做修改
+    """
+    data = await _update_user_roles(db, user_id, add=[], remove=[role_id])
+    return ResponseModel.success(data=data, msg=SuccessMessages.ROLE_REVOKE_SUCCESS)
+
+
+@router.patch("/users/{user_id}/roles", response_model=ResponseModel[dict], summary="增量调整用户角色")
+async def update_user_roles(
+    user_id: int,
+    role_update: UserRoleUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.USER_UPDATE, Permissions.ROLE_UPDATE]))
+):
+    """
+    增量调整用户角色：添加 add 中的角色，移除 remove 中的角色
+    """
+    data = await _update_user_roles(db, user_id, add=role_update.add, remove=role_update.remove)
+    return ResponseModel.success(data=data, msg=SuccessMessages.USER_ROLES_UPDATE_SUCCESS)
+
+
 # 权限管理API
-@router.get("/permissions", response_model=ResponseModel[List[Permission]], summary="获取所有权限")
+@router.get("/permissions", response_model=PageResponseModel[List[Permission]], summary="获取所有权限")
 async def get_permissions(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.PERMISSION_READ]))
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.PERMISSION_READ]))
 ):
     """
     获取所有权限列表
+    
+    按ID顺序游标分页：用响应中的 next_cursor 作为 cursor 参数获取下一页，为 null 时已是最后一页。
+    仍支持 skip 偏移分页（未传 cursor 且 skip 大于 0 时使用），此时 next_cursor 为 null
     """
-    permissions = await PermissionService.get_permissions(db, skip=skip, limit=limit)
-    return ResponseModel.success(data=permissions)
+    if cursor is None and skip > 0:
+        permissions_json = await PermissionService.get_permissions_json(db, skip=skip, limit=limit)
+        return page_json_response(permissions_json, None)
+    permissions_json, next_cursor = await PermissionService.get_permissions_page_json(db, after_id=decode_cursor(cursor), limit=limit)
+    return page_json_response(permissions_json, next_cursor)
 
 
 @router.get("/permissions/{permission_id}", response_model=ResponseModel[Permission], summary="获取权限详情")
 async def get_permission(
     permission_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.PERMISSION_READ]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.PERMISSION_READ]))
 ):
     """
     根据ID获取权限详情
     """
-    permission = await PermissionService.get_permission(db, permission_id=permission_id)
-    if permission is None:
+    permission_json = await PermissionService.get_permission_json(db, permission_id=permission_id)
+    if permission_json is None:
         raise APIException(code=ErrorCode.PERMISSION_NOT_FOUND, message=ErrorMessages.PERMISSION_NOT_FOUND)
-    return ResponseModel.success(data=permission)
+    return success_json_response(permission_json)
 
 
 @router.post("/permissions", 
@@ -241,8 +348,8 @@ async def get_permission(
 )
 async def create_permission(
     permission_create: PermissionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.PERMISSION_CREATE]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.PERMISSION_CREATE]))
 ):
     """
     创建新权限
@@ -266,8 +373,8 @@ async def create_permission(
 async def update_permission(
     permission_id: int,
     permission_update: PermissionUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.PERMISSION_UPDATE]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.PERMISSION_UPDATE]))
 ):
     """
     更新权限信息
@@ -281,8 +388,8 @@ async def update_permission(
 @router.delete("/permissions/{permission_id}", response_model=ResponseModel[dict], status_code=status.HTTP_200_OK, summary="删除权限")
 async def delete_permission(
     permission_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_permissions([Permissions.PERMISSION_DELETE]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions([Permissions.PERMISSION_DELETE]))
 ):
     """
     删除权限
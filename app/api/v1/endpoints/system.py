@@ -0,0 +1,26 @@
+import os
+from typing import Any, Dict
+from fastapi import APIRouter, Depends
+from app.core.redis import get_redis_stats
+from app.models.schemas.common import ResponseModel
+from app.utils.permissions import require_superuser
+from app.utils.rate_limit import get_rate_limit_stats
+from app.utils.security import Principal, get_token_cache_stats
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=ResponseModel[Dict[str, Any]], summary="获取运行指标")
+async def get_metrics(current_user: Principal = Depends(require_superuser)):
+    """
+    获取当前工作进程的运行指标（仅超级管理员）
+    
+    包括限流与配额决策计数、令牌缓存命中情况、Redis 连接池与熔断器状态。
+    计数为进程级，多进程部署时按 worker.pid 区分并汇总
+    """
+    return ResponseModel.success(data={
+        "worker": {"pid": os.getpid()},
+        "rate_limit": get_rate_limit_stats(),
+        "token_cache": get_token_cache_stats(),
+        "redis": get_redis_stats(),
+    })
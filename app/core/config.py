@@ -1,6 +1,7 @@
 from typing import List
 from pydantic_settings import BaseSettings
-from pydantic import AnyHttpUrl, field_validator, ConfigDict
+from pydantic import AnyHttpUrl, Field, field_validator, ConfigDict
+from sqlalchemy.engine import make_url
 import json
 
 class Settings(BaseSettings):
@@ -26,11 +27,48 @@ class Settings(BaseSettings):
             return v
         values = info.data
         return f"mysql+pymysql://{values['DB_USER']}:{values['DB_PASSWORD']}@{values['DB_HOST']}:{values['DB_PORT']}/{values['DB_NAME']}"
+
+    # 异步数据库配置（默认由 DATABASE_URL 推导，驱动替换为 aiomysql）
+    ASYNC_DATABASE_URL: str | None = Field(default=None, validate_default=True)
+
+    @field_validator("ASYNC_DATABASE_URL", mode="before")
+    @classmethod
+    def assemble_async_db_url(cls, v: str | None, info) -> str:
+        if v:
+            return v
+        url = make_url(info.data["DATABASE_URL"]).set(drivername="mysql+aiomysql")
+        return url.render_as_string(hide_password=False)
+
+    # 数据库连接池配置（同步与异步引擎共用）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = True
+    DB_ECHO: bool = False
     
     # JWT配置
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # 在访问令牌中携带权限位掩码与授权版本号，鉴权时无需查询数据库
+    JWT_EMBED_PERMISSIONS: bool = False
+    # 已解码令牌的进程内缓存（按令牌哈希索引，令牌过期时失效）
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_SIZE: int = 4096
+    # 密码哈希进程池：工作进程数（0 表示在线程池中执行）与排队上限，超过上限直接返回服务不可用
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # bcrypt 成本因子与单次哈希耗时目标（毫秒），由 python -m app.scripts.calibrate_hash 校准后写入 .env
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_TARGET_MS: int = 250
+
+    @field_validator("PASSWORD_HASH_ROUNDS")
+    @classmethod
+    def check_hash_rounds(cls, v: int) -> int:
+        if not 4 <= v <= 31:
+            raise ValueError("PASSWORD_HASH_ROUNDS 必须在 4 到 31 之间")
+        return v
     
     # CORS配置
     ALLOWED_ORIGINS: List[str] = ["*"]
@@ -67,6 +105,63 @@ class Settings(BaseSettings):
         password_part = f":{values.get('REDIS_PASSWORD')}@" if values.get('REDIS_PASSWORD') else "@"
         return f"redis://{password_part}{values.get('REDIS_HOST', 'localhost')}:{values.get('REDIS_PORT', 6379)}/{values.get('REDIS_DB', 0)}"
     
+    # Redis连接池配置（每个进程一个异步连接池，同步调用方通过适配器复用）
+    REDIS_POOL_SIZE: int = 20
+    REDIS_POOL_TIMEOUT: float = 2.0  # 连接数达到上限时等待空闲连接的秒数
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_CONNECT_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # 空闲超过该秒数的连接在使用前先 PING
+    REDIS_RETRY_ATTEMPTS: int = 2  # 连接或超时错误的重试次数（仅此一层重试），单条命令最长约 (次数 + 1) × REDIS_SOCKET_TIMEOUT
+    REDIS_RETRY_BACKOFF_BASE: float = 0.05
+    REDIS_RETRY_BACKOFF_MAX: float = 1.0
+    REDIS_SYNC_TIMEOUT: float = 5.0  # 同步适配器等待结果的秒数
+    
+    # Redis熔断器配置：连续失败（含耗时超限）达到阈值后打开，打开期间直接绕过 Redis
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = 5
+    REDIS_BREAKER_LATENCY_THRESHOLD: float = 0.5  # 单次调用耗时超过该秒数视为失败，0 表示不检查
+    REDIS_BREAKER_RESET_TIMEOUT: float = 10.0  # 打开后进入半开探测前的秒数
+    REDIS_BREAKER_HALF_OPEN_CALLS: int = 1
+    
+    # 限流配置（滑动窗口，窗口单位为秒；Redis 不可用时放行）
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # 仅在可信反向代理之后开启
+    LOGIN_RATE_LIMIT_PER_IP: int = 20
+    LOGIN_RATE_LIMIT_PER_USERNAME: int = 5
+    LOGIN_RATE_LIMIT_WINDOW: int = 60
+    REGISTER_RATE_LIMIT_PER_IP: int = 5
+    REGISTER_RATE_LIMIT_WINDOW: int = 3600
+    
+    # 配额配置（进程内令牌桶，定期批量同步到 Redis；窗口单位为秒）
+    QUOTA_ENABLED: bool = True
+    QUOTA_SYNC_INTERVAL: float = 1.0
+    QUOTA_MAX_BUCKETS: int = 10000
+    RBAC_QUOTA_PER_USER: int = 600  # 每个用户在所有 RBAC 接口上的配额
+    RBAC_QUOTA_PER_ROUTE: int = 120  # 每个用户在单个 RBAC 接口上的配额
+    RBAC_QUOTA_WINDOW: int = 60
+    
+    # 角色删除配置：拥有该角色的用户数超过阈值时转为后台分批删除（0 表示始终同步删除）
+    RBAC_DELETE_BACKGROUND_THRESHOLD: int = 10000
+    RBAC_DELETE_CHUNK_SIZE: int = 1000
+    
+    # 批量分配角色配置：每批写入的用户-角色关联数，单次请求允许的关联总数上限
+    RBAC_BULK_CHUNK_SIZE: int = 1000
+    RBAC_BULK_MAX_PAIRS: int = 50000
+    
+    # 角色或权限变更时逐个失效受影响用户权限缓存的用户数上限，超出时使全部用户权限缓存失效
+    RBAC_TARGETED_INVALIDATION_MAX_USERS: int = 1000
+    
+    # 本地缓存配置（进程内 LRU，位于 Redis 之前，通过 Redis 发布订阅保持各进程一致）
+    CACHE_LOCAL_ENABLED: bool = True
+    CACHE_LOCAL_MAX_SIZE: int = 1024
+    CACHE_LOCAL_TTL: int = 30
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidation"
+    CACHE_INVALIDATION_BACKGROUND: bool = False  # 写操作提交后在后台刷新缓存失效，不等待 Redis
+    
+    # 缓存编解码配置
+    CACHE_CODEC: str = "pickle"  # pickle / json / msgpack
+    CACHE_COMPRESSION: str = "none"  # none / zstd / lz4（需安装对应依赖）
+    CACHE_COMPRESSION_THRESHOLD: int = 1024  # 超过该字节数才压缩
+    
     model_config = ConfigDict(
         env_file=".env",
         case_sensitive=True,
@@ -1,91 +1,356 @@
-from typing import Optional
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, Optional
 import aioredis
-from redis import Redis, ConnectionPool
+from aioredis.client import Pipeline
+from aioredis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Redis连接池
-redis_pool: Optional[ConnectionPool] = None
-# 同步Redis客户端
-redis_client: Optional[Redis] = None
-# 异步Redis客户端
-async_redis_client: Optional[aioredis.Redis] = None
-
-
-def create_redis_pool() -> ConnectionPool:
-    """创建Redis连接池"""
-    return ConnectionPool(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        db=settings.REDIS_DB,
-        password=settings.REDIS_PASSWORD or None,
-        decode_responses=True,
-        encoding='utf-8',
-        max_connections=10,
-        socket_timeout=5,
-        socket_connect_timeout=5,
-        retry_on_timeout=True
-    )
-
-
-def get_redis() -> Redis:
-    """获取同步Redis客户端"""
-    global redis_client, redis_pool
+
+class MeteredConnectionPool(aioredis.BlockingConnectionPool):
+    """统计连接获取、创建与等待超时次数的阻塞连接池
+
+    连接数达到上限时，获取连接最多等待 timeout 秒，超时抛出 ConnectionError
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.acquired = 0
+        self.created = 0
+        self.exhausted = 0
+        super().__init__(*args, **kwargs)
+
+    def make_connection(self):
+        self.created += 1
+        return super().make_connection()
+
+    async def get_connection(self, command_name, *keys, **options):
+        self.acquired += 1
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except RedisConnectionError as e:
+            # 等待空闲连接超时；建立连接失败不计入
+            if "No connection available" in str(e):
+                self.exhausted += 1
+            raise
+
+
+class CircuitOpenError(RedisConnectionError):
+    """熔断器打开，命令未发送到 Redis"""
+
+
+class CircuitBreaker:
+    """Redis熔断器
+
+    连续 failure_threshold 次失败（连接错误、超时或耗时超过 latency_threshold）后打开，
+    打开期间所有命令立即失败，不再等待网络超时；reset_timeout 秒后进入半开状态，
+    放行最多 half_open_max_calls 个探测请求，探测成功则关闭，失败则重新打开
+
+    Args:
+        failure_threshold: 触发熔断的连续失败次数
+        latency_threshold: 视为失败的命令耗时（秒），0 表示不检查耗时
+        reset_timeout: 打开后进入半开状态前的等待时间（秒）
+        half_open_max_calls: 半开状态下同时放行的探测请求数
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        latency_threshold: float,
+        reset_timeout: float,
+        half_open_max_calls: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态，打开超过 reset_timeout 后视为半开"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于打开状态（不放行任何请求）"""
+        return self.state == self.OPEN
+
+    def allow(self) -> bool:
+        """判断是否放行本次请求，半开状态下占用一个探测名额"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            if self._state == self.OPEN:
+                self._state = self.HALF_OPEN
+                self._probes = 0
+            if self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+        self.rejected += 1
+        return False
+
+    def release(self) -> None:
+        """归还探测名额（调用未完成，既不算成功也不算失败）"""
+        if self._state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self, elapsed: float) -> None:
+        """记录一次成功的调用，耗时超限时按失败处理"""
+        if self.latency_threshold and elapsed > self.latency_threshold:
+            self.record_failure()
+            return
+        if self._state != self.CLOSED:
+            logger.info("Redis circuit breaker closed")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probes = 0
+
+    def record_failure(self) -> None:
+        """记录一次失败的调用"""
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.trips += 1
+                logger.warning(f"Redis circuit breaker opened after {self._failures} failures")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """熔断器状态与计数"""
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+redis_breaker = CircuitBreaker(
+    failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    latency_threshold=settings.REDIS_BREAKER_LATENCY_THRESHOLD,
+    reset_timeout=settings.REDIS_BREAKER_RESET_TIMEOUT,
+    half_open_max_calls=settings.REDIS_BREAKER_HALF_OPEN_CALLS,
+)
+
+
+async def _guarded(call: Callable[[], Any]) -> Any:
+    """经过熔断器执行一次 Redis 调用"""
+    if not redis_breaker.allow():
+        raise CircuitOpenError("Redis circuit breaker is open")
+    start = time.monotonic()
     try:
-        if redis_client is None:
-            if redis_pool is None:
-                redis_pool = create_redis_pool()
-            redis_client = Redis(connection_pool=redis_pool)
-        return redis_client
-    except Exception as e:
-        logger.error(f"Redis connection error: {str(e)}")
+        result = await call()
+    except (RedisConnectionError, RedisTimeoutError):
+        redis_breaker.record_failure()
+        raise
+    except Exception:
+        # 命令错误等由 Redis 返回的错误说明连接正常
+        redis_breaker.record_success(time.monotonic() - start)
         raise
+    except BaseException:
+        # 调用被取消，归还半开状态下占用的探测名额
+        redis_breaker.release()
+        raise
+    redis_breaker.record_success(time.monotonic() - start)
+    return result
+
+
+class ManagedPipeline(Pipeline):
+    """经过熔断器执行的管道"""
+
+    async def execute(self, raise_on_error: bool = True):
+        return await _guarded(lambda: super(ManagedPipeline, self).execute(raise_on_error))
+
+
+class ManagedRedis(aioredis.Redis):
+    """经过熔断器执行、连接或超时错误时按指数退避重试的异步客户端
+
+    单条命令与管道经过熔断器；发布订阅使用独立的长连接，不经过熔断器。
+    超时后重试可能使 INCR 等非幂等命令重复执行，本项目中此类命令仅用于版本号与计数，可以容忍
+    """
+
+    retries = 0
+
+    async def execute_command(self, *args, **options):
+        # 包括重试在内的一次调用只计入熔断器一次
+        return await _guarded(lambda: self._execute_with_retry(*args, **options))
+
+    async def _execute_with_retry(self, *args, **options):
+        """执行命令，连接或超时错误时按指数退避重试
+
+        连接池不再做超时重试，单条命令最长耗时约为 (REDIS_RETRY_ATTEMPTS + 1) 个套接字超时加退避时间
+        """
+        attempt = 0
+        while True:
+            try:
+                return await super().execute_command(*args, **options)
+            except (RedisConnectionError, RedisTimeoutError) as e:
+                if attempt >= settings.REDIS_RETRY_ATTEMPTS:
+                    raise
+                # 全抖动退避，避免大量请求同时重连
+                delay = random.uniform(0, min(settings.REDIS_RETRY_BACKOFF_MAX, settings.REDIS_RETRY_BACKOFF_BASE * 2 ** attempt))
+                attempt += 1
+                ManagedRedis.retries += 1
+                logger.warning(f"Redis command {args[0]} failed ({e}), retry {attempt} in {delay:.3f}s")
+                await asyncio.sleep(delay)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> ManagedPipeline:
+        return ManagedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class RedisManager:
+    """Redis连接管理器
+
+    每个进程只维护一个异步连接池，连接数上限、超时、重试与健康检查间隔均来自配置；
+    同步调用方通过 SyncRedisAdapter 复用同一个连接池
+    """
+
+    def __init__(self):
+        self._client: Optional[aioredis.Redis] = None
+        self._pool: Optional[MeteredConnectionPool] = None
+        self._lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_client(self) -> aioredis.Redis:
+        """按配置创建连接池与客户端（二进制安全，返回 bytes）"""
+        self._pool = MeteredConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_POOL_SIZE,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            # 重试只在 ManagedRedis 中进行，避免与连接层重试叠加放大超时
+            retry_on_timeout=False,
+            decode_responses=False,
+        )
+        return ManagedRedis(connection_pool=self._pool)
+
+    async def get_client(self) -> aioredis.Redis:
+        """获取异步客户端，首次调用时创建"""
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    self._client = self._create_client()
+                    self._loop = asyncio.get_running_loop()
+        return self._client
+
+    async def init(self) -> None:
+        """创建连接池并验证连接"""
+        client = await self.get_client()
+        await client.ping()
+
+    async def close(self) -> None:
+        """关闭客户端与连接池"""
+        client, pool = self._client, self._pool
+        self._client = self._pool = self._loop = None
+        if client is not None:
+            await client.close()
+        if pool is not None:
+            await pool.disconnect()
+
+    def run_sync(self, func: Callable[[aioredis.Redis], Any], timeout: Optional[float] = None) -> Any:
+        """在事件循环线程中执行异步调用，并在当前线程等待结果
+
+        只能在线程池等非事件循环线程中调用
+        """
+        loop = self._loop
+        if self._client is None or loop is None:
+            raise RuntimeError("Redis connection pool is not initialized")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("SyncRedisAdapter cannot be used from the event loop thread, use get_async_redis()")
+        future = asyncio.run_coroutine_threadsafe(func(self._client), loop)
+        return future.result(timeout or settings.REDIS_SYNC_TIMEOUT)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计信息
+
+        Returns:
+            Dict[str, Any]: 连接上限、已创建连接数、获取次数、复用率、等待超时次数与重试次数
+        """
+        pool = self._pool
+        if pool is None:
+            return {}
+        return {
+            "max_connections": pool.max_connections,
+            "created": pool.created,
+            "acquired": pool.acquired,
+            "reuse_ratio": round(1 - pool.created / pool.acquired, 4) if pool.acquired else 0.0,
+            "exhausted": pool.exhausted,
+            "retries": ManagedRedis.retries,
+        }
+
+
+class SyncRedisAdapter:
+    """同步Redis适配器
+
+    将同步调用转发到事件循环中的异步客户端，与异步代码共用同一个连接池，
+    用于运行在线程池中的少量同步代码
+
+    Example:
+        get_redis().get("key")
+    """
+
+    def __init__(self, manager: RedisManager):
+        self._manager = manager
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        def call(*args, **kwargs):
+            return self._manager.run_sync(lambda client: getattr(client, name)(*args, **kwargs))
+        return call
+
+
+redis_manager = RedisManager()
+sync_redis = SyncRedisAdapter(redis_manager)
+
+
+def get_redis() -> SyncRedisAdapter:
+    """获取同步Redis客户端（复用异步连接池的适配器）"""
+    return sync_redis
 
 
 async def get_async_redis() -> aioredis.Redis:
-    """获取异步Redis客户端"""
-    global async_redis_client
+    """获取异步Redis客户端
+
+    客户端不对响应做解码，返回值为 bytes
+    """
     try:
-        if async_redis_client is None:
-            async_redis_client = aioredis.from_url(
-                settings.REDIS_URL,
-                decode_responses=True,
-                encoding='utf-8',
-                socket_timeout=5,
-                socket_connect_timeout=5,
-                retry_on_timeout=True
-            )
-        return async_redis_client
+        return await redis_manager.get_client()
     except Exception as e:
         logger.error(f"Async Redis connection error: {str(e)}")
         raise
 
 
+def get_redis_stats() -> Dict[str, Any]:
+    """获取Redis连接池与熔断器统计信息"""
+    return {**redis_manager.stats(), "breaker": redis_breaker.stats()}
+
+
 async def init_redis_pool() -> None:
     """初始化Redis连接池"""
-    global async_redis_client, redis_pool, redis_client
     try:
-        # 初始化同步连接池
-        if redis_pool is None:
-            redis_pool = create_redis_pool()
-            redis_client = Redis(connection_pool=redis_pool)
-        
-        # 初始化异步连接
-        if async_redis_client is None:
-            async_redis_client = aioredis.from_url(
-                settings.REDIS_URL,
-                decode_responses=True,
-                encoding='utf-8',
-                socket_timeout=5,
-                socket_connect_timeout=5,
-                retry_on_timeout=True
-            )
-        
-        # 测试连接
-        await async_redis_client.ping()
-        redis_client.ping()
+        await redis_manager.init()
         logger.info("Redis connection pool initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize Redis connection pool: {str(e)}")
@@ -94,21 +359,9 @@ async def init_redis_pool() -> None:
 
 async def close_redis_pool() -> None:
     """关闭Redis连接池"""
-    global async_redis_client, redis_client, redis_pool
     try:
-        if async_redis_client is not None:
-            await async_redis_client.close()
-            async_redis_client = None
-        
-        if redis_client is not None:
-            redis_client.close()
-            redis_client = None
-        
-        if redis_pool is not None:
-            redis_pool.disconnect()
-            redis_pool = None
-        
+        await redis_manager.close()
         logger.info("Redis connection pool closed successfully")
     except Exception as e:
         logger.error(f"Error closing Redis connection pool: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
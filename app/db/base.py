@@ -1,20 +1,44 @@
+from typing import AsyncGenerator
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from app.core.config import settings
 
 # 创建数据库引擎
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,  # 启用连接池心跳检测
-    pool_size=5,  # 连接池大小
-    max_overflow=10,  # 最大溢出连接数
-    pool_recycle=3600,  # 连接回收时间（秒）
+    pool_pre_ping=settings.DB_POOL_PRE_PING,  # 启用连接池心跳检测
+    pool_size=settings.DB_POOL_SIZE,  # 连接池大小
+    max_overflow=settings.DB_MAX_OVERFLOW,  # 最大溢出连接数
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # 获取连接超时时间（秒）
+    pool_recycle=settings.DB_POOL_RECYCLE,  # 连接回收时间（秒）
+    echo=settings.DB_ECHO,
+)
+
+# 创建异步数据库引擎（供 async 接口使用，避免阻塞事件循环）
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    echo=settings.DB_ECHO,
 )
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 创建异步会话工厂
+# expire_on_commit=False: 提交后仍可访问已加载的属性，避免在事件循环中触发隐式IO
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -24,4 +48,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# 获取异步数据库会话的依赖函数
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
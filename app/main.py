@@ -5,6 +5,11 @@ from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.exceptions import add_exception_handlers
 from app.core.redis import init_redis_pool, close_redis_pool
+from app.db.base import async_engine
+from app.utils.cache import drain_background_invalidations, start_invalidation_listener, stop_invalidation_listener
+from app.utils.hashing import password_hasher
+from app.utils.quota import start_quota_sync, stop_quota_sync
+from app.utils.permissions import sync_permission_catalog
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -91,6 +96,14 @@ def create_application() -> FastAPI:
         logger.info("Initializing application...")
         # 初始化Redis连接池
         await init_redis_pool()
+        # 启动缓存失效消息订阅（进程内一级缓存依赖该订阅保持一致）
+        await start_invalidation_listener()
+        # 同步权限目录到数据库并加载权限位注册表
+        await sync_permission_catalog()
+        # 启动密码哈希进程池
+        password_hasher.start()
+        # 启动配额后台同步
+        await start_quota_sync()
         logger.info("Application initialized")
 
     # 关闭事件
@@ -98,8 +111,16 @@ def create_application() -> FastAPI:
     async def shutdown_event():
         """应用关闭时执行"""
         logger.info("Shutting down application...")
+        await stop_quota_sync()
+        # 等待后台缓存失效任务完成
+        await drain_background_invalidations()
+        await stop_invalidation_listener()
         # 关闭Redis连接池
         await close_redis_pool()
+        # 释放异步数据库连接池
+        await async_engine.dispose()
+        # 关闭密码哈希进程池
+        password_hasher.shutdown()
         logger.info("Application shutdown complete")
 
     return application
@@ -2,20 +2,31 @@ from sqlalchemy import Column, Integer, String, ForeignKey, Table
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
+# 关联表外键均为 ON DELETE CASCADE，删除角色、权限或用户时由数据库清理关联行，
+# 关系上配合 passive_deletes=True，ORM 不再加载关联集合逐行删除
+
 # 角色-权限关联表
 role_permission = Table(
     "role_permission",
     Base.metadata,
-    Column("role_id", Integer, ForeignKey("role.id"), primary_key=True),
-    Column("permission_id", Integer, ForeignKey("permission.id"), primary_key=True),
+    Column("role_id", Integer, ForeignKey("role.id", ondelete="CASCADE"), primary_key=True),
+    Column("permission_id", Integer, ForeignKey("permission.id", ondelete="CASCADE"), primary_key=True),
 )
 
 # 用户-角色关联表
 user_role = Table(
     "user_role",
     Base.metadata,
-    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
-    Column("role_id", Integer, ForeignKey("role.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("role_id", Integer, ForeignKey("role.id", ondelete="CASCADE"), primary_key=True),
+)
+
+# 权限位编号分配序列（单行），只增不减，已删除权限的位编号不会分配给新权限
+permission_bit_sequence = Table(
+    "permission_bit_sequence",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("next_bit", Integer, nullable=False),
 )
 
 
@@ -28,8 +39,8 @@ class Role(Base):
     description = Column(String(255), nullable=True)
     
     # 关联关系
-    permissions = relationship("Permission", secondary=role_permission, back_populates="roles")
-    users = relationship("User", secondary=user_role, back_populates="roles")
+    permissions = relationship("Permission", secondary=role_permission, back_populates="roles", passive_deletes=True)
+    users = relationship("User", secondary=user_role, back_populates="roles", passive_deletes=True)
 
 
 class Permission(Base):
@@ -39,6 +50,8 @@ class Permission(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, index=True)
     description = Column(String(255), nullable=True)
+    # 权限位编号，由 permission_bit_sequence 单调分配，删除后空出的编号不再复用
+    bit = Column(Integer, unique=True, nullable=False)
     
     # 关联关系
-    roles = relationship("Role", secondary=role_permission, back_populates="permissions") 
\ No newline at end of file
+    roles = relationship("Role", secondary=role_permission, back_populates="permissions", passive_deletes=True) 
\ No newline at end of file
@@ -26,7 +26,7 @@ class User(Base):
     is_superuser = Column(Boolean, default=False)
     
     # 关联关系
-    roles = relationship("Role", secondary="user_role", back_populates="users")
+    roles = relationship("Role", secondary="user_role", back_populates="users", passive_deletes=True)
 
     def set_password(self, password: str):
         """设置用户密码
@@ -35,11 +35,3 @@ class User(Base):
             password: 明文密码
         """
         self.hashed_password = get_password_hash(password)
-        
-    def get_permissions(self):
-        """获取用户所有权限"""
-        permissions = set()
-        for role in self.roles:
-            for permission in role.permissions:
-                permissions.add(permission.name)
-        return list(permissions) 
\ No newline at end of file
@@ -32,6 +32,7 @@ class ErrorCode:
     # 系统相关错误码 (1301-1400)
     SYSTEM_ERROR = 1301  # 系统错误
     SERVICE_UNAVAILABLE = 1302  # 服务不可用
+    TOO_MANY_REQUESTS = 1303  # 请求过于频繁
     
     # 第三方服务相关错误码 (1401-1500)
     THIRD_PARTY_ERROR = 1401  # 第三方服务错误
@@ -74,4 +75,13 @@ class ResponseModel(BaseModel, Generic[DataT]):
         Returns:
             ResponseModel: 错误响应对象
         """
-        return cls(code=code, msg=msg, data=data) 
\ No newline at end of file
+        return cls(code=code, msg=msg, data=data)
+
+
+class PageResponseModel(ResponseModel[DataT], Generic[DataT]):
+    """游标分页响应模式
+    
+    属性:
+        next_cursor: 下一页游标，没有下一页时为 null
+    """
+    next_cursor: Optional[str] = Field(default=None, description="下一页游标，没有下一页时为 null")
@@ -12,6 +12,8 @@ class ErrorMessages:
     # 通用错误消息
     UNKNOWN_ERROR = "服务器内部错误"
     PARAM_ERROR = "请求参数错误"
+    TOO_MANY_ITEMS = "单次请求的数据量超出限制"
+    INVALID_CURSOR = "无效的分页游标"
     
     # 认证相关错误消息
     INVALID_CREDENTIALS = "用户名或密码错误"
@@ -33,6 +35,8 @@ class ErrorMessages:
     SYSTEM_ERROR = "系统错误"
     DATABASE_ERROR = "数据库操作失败"
     SERVICE_UNAVAILABLE = "服务不可用"
+    PASSWORD_HASHER_BUSY = "服务繁忙，请稍后重试"
+    TOO_MANY_REQUESTS = "请求过于频繁，请稍后重试"
     
     # 第三方服务相关错误消息
     THIRD_PARTY_ERROR = "第三方服务错误"
@@ -55,7 +59,11 @@ class SuccessMessages:
     ROLE_CREATE_SUCCESS = "角色创建成功"
     ROLE_UPDATE_SUCCESS = "角色更新成功"
     ROLE_DELETE_SUCCESS = "角色删除成功"
+    ROLE_DELETE_SCHEDULED = "角色删除任务已提交，将在后台完成"
     ROLE_ASSIGN_SUCCESS = "角色分配成功"
+    ROLE_REVOKE_SUCCESS = "角色移除成功"
+    USER_ROLES_UPDATE_SUCCESS = "用户角色更新成功"
+    ROLE_BULK_ASSIGN_SUCCESS = "批量分配角色成功"
     PERMISSION_CREATE_SUCCESS = "权限创建成功"
     PERMISSION_UPDATE_SUCCESS = "权限更新成功"
     PERMISSION_DELETE_SUCCESS = "权限删除成功" 
\ No newline at end of file
@@ -48,4 +48,26 @@ class Role(RoleBase):
 
 # 用户角色分配
 class UserRoleAssign(BaseModel):
-    role_ids: List[int] 
\ No newline at end of file
+    role_ids: List[int]
+
+
+# 用户角色增量调整
+class UserRoleUpdate(BaseModel):
+    add: List[int] = []
+    remove: List[int] = []
+
+
+# 批量分配角色
+class UserRolesItem(BaseModel):
+    user_id: int
+    role_ids: List[int]
+
+
+class RoleUsersItem(BaseModel):
+    role_id: int
+    user_ids: List[int]
+
+
+class UserRoleBulkAssign(BaseModel):
+    assignments: List[UserRolesItem] = []
+    role_users: List[RoleUsersItem] = []
@@ -46,9 +46,22 @@ class TokenPayload(BaseModel):
     
     属性:
         sub: 用户ID
+        pm: 权限位掩码（十六进制），仅在启用 JWT_EMBED_PERMISSIONS 时存在
+        rv: 签发时的授权版本号，与当前版本不一致时需回源数据库
+        act: 是否激活
+        su: 是否超级管理员
     """
     sub: Optional[int] = Field(
         default=None,
         description="用户ID",
         example=1
-    ) 
\ No newline at end of file
+    )
+    pm: Optional[str] = Field(default=None, description="权限位掩码（十六进制）")
+    rv: Optional[str] = Field(default=None, description="授权版本号")
+    act: Optional[bool] = Field(default=None, description="是否激活")
+    su: Optional[bool] = Field(default=None, description="是否超级管理员")
+    
+    @property
+    def has_permission_claims(self) -> bool:
+        """是否携带完整的权限声明"""
+        return None not in (self.pm, self.rv, self.act, self.su) 
\ No newline at end of file
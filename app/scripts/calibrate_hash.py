@@ -0,0 +1,117 @@
+"""
+密码哈希成本校准
+
+在当前主机上测量不同 bcrypt 成本因子的单次哈希耗时，选出不超过目标耗时的最大成本因子，
+并将 PASSWORD_HASH_ROUNDS 与 PASSWORD_HASH_TARGET_MS 写入 .env。用户下次登录时，
+存储的哈希会按新的成本因子自动重新计算
+
+用法:
+    python -m app.scripts.calibrate_hash [--target-ms 250] [--samples 3] [--env-file .env] [--dry-run]
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+from typing import Dict, List, Tuple
+from passlib.hash import bcrypt
+from app.core.config import settings
+
+# 成本因子每加一，耗时约翻倍；低于 10 的成本不再具备足够的抗暴力破解能力
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+
+def measure(rounds: int, samples: int) -> float:
+    """测量指定成本因子的单次哈希耗时
+
+    Args:
+        rounds: bcrypt 成本因子
+        samples: 采样次数
+
+    Returns:
+        float: 耗时中位数（毫秒）
+    """
+    hasher = bcrypt.using(rounds=rounds)
+    timings: List[float] = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: int, samples: int) -> Tuple[int, Dict[int, float]]:
+    """选出耗时不超过目标的最大成本因子
+
+    Args:
+        target_ms: 单次哈希耗时目标（毫秒）
+        samples: 每个成本因子的采样次数
+
+    Returns:
+        Tuple[int, Dict[int, float]]: 选定的成本因子，以及各成本因子的实测耗时
+    """
+    results: Dict[int, float] = {}
+    chosen = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed = measure(rounds, samples)
+        results[rounds] = elapsed
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    return chosen, results
+
+
+def write_env(path: str, values: Dict[str, str]) -> None:
+    """更新 .env 文件中的配置项，不存在的配置项追加到文件末尾
+
+    Args:
+        path: .env 文件路径
+        values: 配置项
+    """
+    lines: List[str] = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        match = re.match(r"\s*([A-Z0-9_]+)\s*=", line)
+        if match and match.group(1) in remaining:
+            key = match.group(1)
+            lines[i] = f"{key}={remaining.pop(key)}"
+    if remaining:
+        if lines:
+            lines.append("")
+        lines.append("# 密码哈希校准结果（python -m app.scripts.calibrate_hash）")
+        lines.extend(f"{key}={value}" for key, value in remaining.items())
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="校准 bcrypt 成本因子并写入配置")
+    parser.add_argument("--target-ms", type=int, default=settings.PASSWORD_HASH_TARGET_MS, help="单次哈希耗时目标（毫秒）")
+    parser.add_argument("--samples", type=int, default=3, help="每个成本因子的采样次数")
+    parser.add_argument("--env-file", default=".env", help="写入的 .env 文件路径")
+    parser.add_argument("--dry-run", action="store_true", help="只输出结果，不写入文件")
+    args = parser.parse_args()
+
+    rounds, results = calibrate(args.target_ms, max(1, args.samples))
+    for r, elapsed in results.items():
+        marker = " <-" if r == rounds else ""
+        print(f"rounds={r:2d}  {elapsed:8.1f} ms{marker}")
+    print(f"目标耗时 {args.target_ms} ms，选定成本因子 {rounds}（当前配置 {settings.PASSWORD_HASH_ROUNDS}）")
+
+    if args.dry_run:
+        return
+    write_env(args.env_file, {
+        "PASSWORD_HASH_ROUNDS": str(rounds),
+        "PASSWORD_HASH_TARGET_MS": str(args.target_ms),
+    })
+    print(f"已写入 {args.env_file}，重启服务后生效")
+
+
+if __name__ == "__main__":
+    main()
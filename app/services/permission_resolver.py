@@ -0,0 +1,124 @@
+from typing import Dict, Iterable, Set
+import logging
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.domain.role import Permission, role_permission, user_role
+from app.utils.permission_registry import mask_from_bits
+
+logger = logging.getLogger(__name__)
+
+
+def effective_permissions_stmt(user_ids: Iterable[int]):
+    """构造查询用户有效权限的语句
+    
+    通过 user_role 与 role_permission 关联表一次连接查询得到 (user_id, 权限名)，
+    不经过 ORM 关系懒加载，避免按角色逐个查询的 N+1 问题
+    
+    Args:
+        user_ids: 用户ID集合
+        
+    Returns:
+        Select: 查询语句
+    """
+    return (
+        select(user_role.c.user_id, Permission.name)
+        .select_from(user_role)
+        .join(role_permission, role_permission.c.role_id == user_role.c.role_id)
+        .join(Permission, Permission.id == role_permission.c.permission_id)
+        .where(user_role.c.user_id.in_(list(user_ids)))
+        .distinct()
+    )
+
+
+def effective_permission_bits_stmt(user_ids: Iterable[int]):
+    """构造查询用户有效权限位编号的语句
+    
+    Args:
+        user_ids: 用户ID集合
+        
+    Returns:
+        Select: 查询语句
+    """
+    return (
+        select(user_role.c.user_id, Permission.bit)
+        .select_from(user_role)
+        .join(role_permission, role_permission.c.role_id == user_role.c.role_id)
+        .join(Permission, Permission.id == role_permission.c.permission_id)
+        .where(user_role.c.user_id.in_(list(user_ids)))
+        .distinct()
+    )
+
+
+class PermissionResolver:
+    """用户有效权限解析
+    
+    有效权限为用户所有角色的权限并集，超级管理员的权限由调用方处理
+    """
+    
+    @staticmethod
+    async def resolve(db: AsyncSession, user_id: int) -> Set[str]:
+        """解析单个用户的有效权限
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            
+        Returns:
+            Set[str]: 权限名集合
+        """
+        result = await db.execute(effective_permissions_stmt([user_id]))
+        return {name for _, name in result.all()}
+    
+    @staticmethod
+    async def resolve_many(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, Set[str]]:
+        """批量解析多个用户的有效权限，一次查询完成
+        
+        Args:
+            db: 数据库会话
+            user_ids: 用户ID集合
+            
+        Returns:
+            Dict[int, Set[str]]: 用户ID到权限名集合的映射，没有任何权限的用户对应空集合
+        """
+        user_ids = set(user_ids)
+        permissions: Dict[int, Set[str]] = {user_id: set() for user_id in user_ids}
+        if not user_ids:
+            return permissions
+        result = await db.execute(effective_permissions_stmt(user_ids))
+        for user_id, name in result.all():
+            permissions[user_id].add(name)
+        return permissions
+    
+    @staticmethod
+    async def resolve_mask(db: AsyncSession, user_id: int) -> int:
+        """解析单个用户的有效权限位掩码（位编号为权限的 bit 列）
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            
+        Returns:
+            int: 权限位掩码
+        """
+        result = await db.execute(effective_permission_bits_stmt([user_id]))
+        return mask_from_bits(bit for _, bit in result.all())
+    
+    @staticmethod
+    async def resolve_masks(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, int]:
+        """批量解析多个用户的有效权限位掩码，一次查询完成
+        
+        Args:
+            db: 数据库会话
+            user_ids: 用户ID集合
+            
+        Returns:
+            Dict[int, int]: 用户ID到权限位掩码的映射
+        """
+        user_ids = set(user_ids)
+        masks: Dict[int, int] = {user_id: 0 for user_id in user_ids}
+        if not user_ids:
+            return masks
+        result = await db.execute(effective_permission_bits_stmt(user_ids))
+        for user_id, bit in result.all():
+            masks[user_id] |= 1 << bit
+        return masks
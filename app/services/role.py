@@ -1,20 +1,113 @@
-from typing import List, Optional, Dict, Any
+from typing import Collection, Iterable, List, Optional, Dict, Any, Set, Tuple
 import logging
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from app.models.domain.role import Role, Permission
+from sqlalchemy import Table, delete, func, insert, select
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import Insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.db.base import AsyncSessionLocal
+from app.models.domain.role import Role, Permission, role_permission, user_role
 from app.models.domain.user import User
-from app.models.schemas.role import RoleCreate, RoleUpdate, PermissionCreate, PermissionUpdate
-from app.utils.cache import async_cache, clear_cache
+from app.models.schemas.role import (
+    RoleCreate, RoleUpdate, PermissionCreate, PermissionUpdate,
+    Role as RoleSchema, Permission as PermissionSchema,
+)
+from app.utils.cache import InvalidationBatch, async_cache, invalidation_batch
+from app.utils.pagination import encode_cursor
+from app.utils.permission_registry import allocate_bits
+from app.utils.permissions import invalidate_user_permissions
 
 logger = logging.getLogger(__name__)
 
+# 列表 DTO 的校验与序列化适配器
+_role_list_adapter = TypeAdapter(List[RoleSchema])
+_permission_list_adapter = TypeAdapter(List[PermissionSchema])
+
+# 创建权限时位编号冲突的最多尝试次数
+_BIT_ALLOCATION_ATTEMPTS = 3
+
+
+async def _existing_ids(db: AsyncSession, column, ids: Iterable[int], chunk_size: int) -> Set[int]:
+    """分批查询已存在的ID"""
+    ids = list(ids)
+    existing: Set[int] = set()
+    for start in range(0, len(ids), chunk_size):
+        result = await db.execute(select(column).where(column.in_(ids[start:start + chunk_size])))
+        existing.update(result.scalars().all())
+    return existing
+
+
+def _role_users(*role_ids: int) -> Select:
+    """拥有指定角色的用户ID查询"""
+    return select(user_role.c.user_id).where(user_role.c.role_id.in_(role_ids)).distinct()
+
+
+def _permission_users(permission_id: int) -> Select:
+    """通过角色拥有指定权限的用户ID查询"""
+    return (
+        select(user_role.c.user_id)
+        .join(role_permission, role_permission.c.role_id == user_role.c.role_id)
+        .where(role_permission.c.permission_id == permission_id)
+        .distinct()
+    )
+
+
+async def _invalidate_users(db: AsyncSession, batch: InvalidationBatch, users: Select) -> None:
+    """只使受影响用户的权限缓存失效
+    
+    受影响用户超过 RBAC_TARGETED_INVALIDATION_MAX_USERS 时，逐个失效的开销接近全量冷启动，
+    改为使整个 user_permissions 命名空间失效。关联行被级联删除前调用
+    
+    Args:
+        db: 数据库会话
+        batch: 缓存失效工作单元
+        users: 受影响用户ID查询
+    """
+    limit = settings.RBAC_TARGETED_INVALIDATION_MAX_USERS
+    user_ids = (await db.execute(users.limit(limit + 1))).scalars().all()
+    await _invalidate_user_ids(batch, user_ids)
+
+
+async def _invalidate_user_ids(batch: InvalidationBatch, user_ids: Collection[int]) -> None:
+    """使给定用户的权限缓存失效，超过 RBAC_TARGETED_INVALIDATION_MAX_USERS 时改为使整个命名空间失效
+    
+    Args:
+        batch: 缓存失效工作单元
+        user_ids: 受影响用户ID
+    """
+    if len(user_ids) > settings.RBAC_TARGETED_INVALIDATION_MAX_USERS:
+        batch.namespace("user_permissions")
+    elif user_ids:
+        await invalidate_user_permissions(*user_ids, batch=batch)
+
+
+def _insert_ignore(table: Table) -> Insert:
+    """忽略主键冲突的 INSERT（MySQL 为 INSERT IGNORE）"""
+    return insert(table).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+
 # 角色服务
 class RoleService:
     @staticmethod
-    @async_cache("roles", 3600)
-    async def get_roles(db: Session, skip: int = 0, limit: int = 100) -> List[Role]:
-        """获取所有角色
+    async def _get_role_with_permissions(db: AsyncSession, role_id: int) -> Optional[Role]:
+        """根据ID获取角色，并预加载权限集合
+        
+        异步会话不支持隐式懒加载，需要显式预加载关联关系
+        """
+        result = await db.execute(
+            select(Role).options(selectinload(Role.permissions)).where(Role.id == role_id)
+        )
+        return result.scalars().first()
+    
+    @staticmethod
+    @async_cache("roles", 3600, stale_ttl=60, lock=True, codec="bytes")
+    async def get_roles_json(db: AsyncSession, skip: int = 0, limit: int = 100) -> bytes:
+        """获取所有角色，返回序列化后的 JSON
+        
+        缓存的是 schema 层 DTO 序列化后的 JSON 字节串，命中时可直接写入响应，
+        无需重建 ORM 对象或再次校验
         
         Args:
             db: 数据库会话
@@ -22,34 +115,99 @@ class RoleService:
             limit: 返回记录数
             
         Returns:
-            List[Role]: 角色列表
+            bytes: 角色列表 JSON
         """
         try:
-            return db.query(Role).offset(skip).limit(limit).all()
+            result = await db.execute(
+                select(Role).options(selectinload(Role.permissions)).order_by(Role.id).offset(skip).limit(limit)
+            )
+            roles = _role_list_adapter.validate_python(result.scalars().all(), from_attributes=True)
+            return _role_list_adapter.dump_json(roles)
         except SQLAlchemyError as e:
             logger.error(f"获取角色列表失败: {e}")
-            return []
+            return b"[]"
     
     @staticmethod
-    @async_cache("role", 3600)
-    async def get_role(db: Session, role_id: int) -> Optional[Role]:
-        """根据ID获取角色
+    @async_cache("roles", 3600, stale_ttl=60, lock=True, codec="msgpack")
+    async def get_roles_page_json(db: AsyncSession, after_id: int = 0, limit: int = 100) -> Tuple[bytes, Optional[str]]:
+        """按主键游标分页获取角色，返回序列化后的 JSON 与下一页游标
+        
+        多取一条记录判断是否还有下一页；缓存值用 msgpack 编码，命中时为列表而非元组
+        
+        Args:
+            db: 数据库会话
+            after_id: 上一页最后一个角色的ID，第一页为 0
+            limit: 返回记录数
+            
+        Returns:
+            Tuple[bytes, Optional[str]]: 角色列表 JSON，下一页游标（没有下一页时为None）
+        """
+        if limit < 1:
+            return b"[]", None
+        try:
+            result = await db.execute(
+                select(Role).options(selectinload(Role.permissions))
+                .where(Role.id > after_id).order_by(Role.id).limit(limit + 1)
+            )
+            rows = result.scalars().all()
+            next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+            roles = _role_list_adapter.validate_python(rows[:limit], from_attributes=True)
+            return _role_list_adapter.dump_json(roles), next_cursor
+        except SQLAlchemyError as e:
+            logger.error(f"获取角色列表失败: {e}")
+            return b"[]", None
+    
+    @staticmethod
+    async def get_roles(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[RoleSchema]:
+        """获取所有角色
+        
+        Args:
+            db: 数据库会话
+            skip: 跳过记录数
+            limit: 返回记录数
+            
+        Returns:
+            List[RoleSchema]: 角色列表
+        """
+        return _role_list_adapter.validate_json(await RoleService.get_roles_json(db, skip=skip, limit=limit))
+    
+    @staticmethod
+    @async_cache("role", 3600, stale_ttl=60, lock=True, codec="bytes")
+    async def get_role_json(db: AsyncSession, role_id: int) -> Optional[bytes]:
+        """根据ID获取角色，返回序列化后的 JSON
         
         Args:
             db: 数据库会话
             role_id: 角色ID
             
         Returns:
-            Optional[Role]: 角色对象，如果不存在则返回None
+            Optional[bytes]: 角色 JSON，如果不存在则返回None
         """
         try:
-            return db.query(Role).filter(Role.id == role_id).first()
+            role = await RoleService._get_role_with_permissions(db, role_id)
+            if role is None:
+                return None
+            return RoleSchema.model_validate(role).model_dump_json().encode()
         except SQLAlchemyError as e:
             logger.error(f"获取角色失败, ID: {role_id}, 错误: {e}")
             return None
     
     @staticmethod
-    async def create_role(db: Session, role_create: RoleCreate) -> Optional[Role]:
+    async def get_role(db: AsyncSession, role_id: int) -> Optional[RoleSchema]:
+        """根据ID获取角色
+        
+        Args:
+            db: 数据库会话
+            role_id: 角色ID
+            
+        Returns:
+            Optional[RoleSchema]: 角色，如果不存在则返回None
+        """
+        role_json = await RoleService.get_role_json(db, role_id=role_id)
+        return RoleSchema.model_validate_json(role_json) if role_json is not None else None
+    
+    @staticmethod
+    async def create_role(db: AsyncSession, role_create: RoleCreate) -> Optional[Role]:
         """创建角色
         
         Args:
@@ -60,36 +218,36 @@ class RoleService:
             Optional[Role]: 创建的角色对象，如果失败则返回None
         """
         try:
-            # 创建角色
-            db_role = Role(
-                name=role_create.name,
-                description=role_create.description
-            )
-            db.add(db_role)
-            db.flush()
-            
-            # 添加权限
-            if role_create.permissions:
-                permissions = db.query(Permission).filter(Permission.id.in_(role_create.permissions)).all()
-                db_role.permissions = permissions
-            
-            db.commit()
-            db.refresh(db_role)
-            
-            # 清除缓存
-            await clear_cache("roles:*")
-            await clear_cache("role:*")
-            await clear_cache("user_permissions:*")  # 清除用户权限缓存
-            
-            logger.info(f"角色创建成功: {db_role.name} (ID: {db_role.id})")
-            return db_role
+            async with invalidation_batch() as batch:
+                # 查询权限（在对象持久化前赋值，避免加载空集合）
+                permissions = []
+                if role_create.permissions:
+                    result = await db.execute(
+                        select(Permission).where(Permission.id.in_(role_create.permissions))
+                    )
+                    permissions = list(result.scalars().all())
+                
+                # 创建角色
+                db_role = Role(
+                    name=role_create.name,
+                    description=role_create.description,
+                    permissions=permissions
+                )
+                db.add(db_role)
+                await db.commit()
+                
+                # 清除缓存（提交成功后随工作单元一次性刷新）；新角色尚无用户，不影响用户权限
+                batch.namespace("roles", "role")
+                
+                logger.info(f"角色创建成功: {db_role.name} (ID: {db_role.id})")
+                return db_role
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"角色创建失败: {e}")
             return None
     
     @staticmethod
-    async def update_role(db: Session, role_id: int, role_update: RoleUpdate) -> Optional[Role]:
+    async def update_role(db: AsyncSession, role_id: int, role_update: RoleUpdate) -> Optional[Role]:
         """更新角色
         
         Args:
@@ -101,40 +259,43 @@ class RoleService:
             Optional[Role]: 更新后的角色对象，如果不存在则返回None
         """
         try:
-            db_role = db.query(Role).filter(Role.id == role_id).first()
-            if not db_role:
-                logger.warning(f"角色不存在, ID: {role_id}")
-                return None
-            
-            # 更新基本信息
-            update_data = role_update.dict(exclude_unset=True)
-            if "permissions" in update_data:
-                permissions = update_data.pop("permissions")
-                if permissions is not None:
-                    db_role.permissions = db.query(Permission).filter(Permission.id.in_(permissions)).all()
-            
-            for key, value in update_data.items():
-                setattr(db_role, key, value)
-            
-            db.commit()
-            db.refresh(db_role)
-            
-            # 清除缓存
-            await clear_cache("roles:*")
-            await clear_cache("role:*")
-            await clear_cache("user_permissions:*")  # 清除用户权限缓存
-            
-            logger.info(f"角色更新成功: {db_role.name} (ID: {db_role.id})")
-            return db_role
+            async with invalidation_batch() as batch:
+                db_role = await RoleService._get_role_with_permissions(db, role_id)
+                if not db_role:
+                    logger.warning(f"角色不存在, ID: {role_id}")
+                    return None
+                
+                # 更新基本信息
+                update_data = role_update.dict(exclude_unset=True)
+                if "permissions" in update_data:
+                    permissions = update_data.pop("permissions")
+                    if permissions is not None:
+                        result = await db.execute(select(Permission).where(Permission.id.in_(permissions)))
+                        db_role.permissions = list(result.scalars().all())
+                        # 权限变化只影响拥有该角色的用户
+                        await _invalidate_users(db, batch, _role_users(role_id))
+                
+                for key, value in update_data.items():
+                    setattr(db_role, key, value)
+                
+                await db.commit()
+                
+                # 清除缓存（提交成功后随工作单元一次性刷新）
+                batch.namespace("roles", "role")
+                
+                logger.info(f"角色更新成功: {db_role.name} (ID: {db_role.id})")
+                return db_role
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"角色更新失败, ID: {role_id}, 错误: {e}")
             return None
     
     @staticmethod
-    async def delete_role(db: Session, role_id: int) -> bool:
+    async def delete_role(db: AsyncSession, role_id: int) -> bool:
         """删除角色
         
+        一条 DELETE 语句完成，关联表中的行由数据库外键级联删除，不加载关联集合
+        
         Args:
             db: 数据库会话
             role_id: 角色ID
@@ -143,68 +304,245 @@ class RoleService:
             bool: 是否删除成功
         """
         try:
-            db_role = db.query(Role).filter(Role.id == role_id).first()
-            if not db_role:
-                logger.warning(f"角色不存在, ID: {role_id}")
-                return False
-            
-            role_name = db_role.name
-            db.delete(db_role)
-            db.commit()
-            
-            # 清除缓存
-            await clear_cache("roles:*")
-            await clear_cache("role:*")
-            await clear_cache("user_permissions:*")  # 清除用户权限缓存
-            
-            logger.info(f"角色删除成功: {role_name} (ID: {role_id})")
-            return True
+            async with invalidation_batch() as batch:
+                role_name = await db.scalar(select(Role.name).where(Role.id == role_id))
+                if role_name is None:
+                    logger.warning(f"角色不存在, ID: {role_id}")
+                    return False
+                
+                # 关联行将被级联删除，先查出受影响的用户
+                await _invalidate_users(db, batch, _role_users(role_id))
+                await db.execute(delete(Role).where(Role.id == role_id))
+                await db.commit()
+                
+                # 清除缓存（提交成功后随工作单元一次性刷新）
+                batch.namespace("roles", "role")
+                
+                logger.info(f"角色删除成功: {role_name} (ID: {role_id})")
+                return True
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"角色删除失败, ID: {role_id}, 错误: {e}")
             return False
     
     @staticmethod
-    async def assign_user_roles(db: Session, user_id: int, role_ids: List[int]) -> Optional[User]:
-        """为用户分配角色
+    async def count_role_users(db: AsyncSession, role_id: int) -> int:
+        """统计拥有该角色的用户数
         
         Args:
             db: 数据库会话
-            user_id: 用户ID
-            role_ids: 角色ID列表
+            role_id: 角色ID
             
         Returns:
-            Optional[User]: 更新后的用户对象，如果不存在则返回None
+            int: 用户数
         """
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                logger.warning(f"用户不存在, ID: {user_id}")
-                return None
-            
-            roles = db.query(Role).filter(Role.id.in_(role_ids)).all()
-            user.roles = roles
-            
-            db.commit()
-            db.refresh(user)
+        return await db.scalar(
+            select(func.count()).select_from(user_role).where(user_role.c.role_id == role_id)
+        )
+    
+    @staticmethod
+    async def delete_role_in_chunks(role_id: int, chunk_size: Optional[int] = None) -> bool:
+        """分批删除角色，用于拥有大量用户的角色，通常在后台任务中执行
+        
+        先移除角色的全部权限并使用户权限缓存失效，使角色立即不再授予任何权限；
+        再按批删除用户-角色关联，每批单独提交，避免长事务与大量行锁；
+        最后删除角色本身（期间新增的关联由外键级联删除）
+        
+        Args:
+            role_id: 角色ID
+            chunk_size: 每批删除的关联行数，默认使用 RBAC_DELETE_CHUNK_SIZE
             
-            # 清除用户权限缓存
-            await clear_cache(f"user_permissions:*")
+        Returns:
+            bool: 是否删除成功
+        """
+        chunk_size = chunk_size or settings.RBAC_DELETE_CHUNK_SIZE
+        async with AsyncSessionLocal() as db:
+            try:
+                async with invalidation_batch() as batch:
+                    await _invalidate_users(db, batch, _role_users(role_id))
+                    await db.execute(delete(role_permission).where(role_permission.c.role_id == role_id))
+                    await db.commit()
+                    batch.namespace("roles", "role")
+                
+                removed = 0
+                while True:
+                    user_ids = (await db.execute(
+                        select(user_role.c.user_id).where(user_role.c.role_id == role_id).limit(chunk_size)
+                    )).scalars().all()
+                    if not user_ids:
+                        break
+                    await db.execute(
+                        delete(user_role).where(user_role.c.role_id == role_id, user_role.c.user_id.in_(user_ids))
+                    )
+                    await db.commit()
+                    removed += len(user_ids)
+                
+                # 角色已不授予任何权限，删除关联与角色不再影响用户权限
+                async with invalidation_batch() as batch:
+                    await db.execute(delete(Role).where(Role.id == role_id))
+                    await db.commit()
+                    batch.namespace("roles", "role")
+                
+                logger.info(f"角色分批删除完成, ID: {role_id}, 移除用户关联: {removed}")
+                return True
+            except SQLAlchemyError as e:
+                await db.rollback()
+                logger.error(f"角色分批删除失败, ID: {role_id}, 错误: {e}")
+                return False
+    
+    @staticmethod
+    async def update_user_roles(
+        db: AsyncSession,
+        user_id: int,
+        add: Iterable[int] = (),
+        remove: Iterable[int] = (),
+    ) -> Optional[Dict[str, Any]]:
+        """增量调整用户角色
+        
+        直接对 user_role 执行 INSERT IGNORE 与 DELETE，不加载用户的角色集合；
+        只使该用户的权限缓存失效，开销与变更量成正比
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            add: 要添加的角色ID，已拥有的角色忽略
+            remove: 要移除的角色ID，未拥有的角色忽略；同时出现在 add 中的角色按添加处理
             
-            logger.info(f"用户角色分配成功: 用户 {user.username} (ID: {user.id}), 角色IDs: {role_ids}")
-            return user
+        Returns:
+            Optional[Dict[str, Any]]: 实际添加数 added、移除数 removed，以及不存在的角色ID missing
+                （存在不存在的角色时不做任何修改）；用户不存在或操作失败时返回None
+        """
+        add_ids = set(add)
+        remove_ids = set(remove) - add_ids
+        try:
+            async with invalidation_batch() as batch:
+                if await db.scalar(select(User.id).where(User.id == user_id)) is None:
+                    logger.warning(f"用户不存在, ID: {user_id}")
+                    return None
+                
+                if add_ids:
+                    existing = set((await db.execute(select(Role.id).where(Role.id.in_(add_ids)))).scalars().all())
+                    missing = sorted(add_ids - existing)
+                    if missing:
+                        logger.warning(f"角色不存在, IDs: {missing}")
+                        return {"added": 0, "removed": 0, "missing": missing}
+                
+                added = removed = 0
+                if add_ids:
+                    result = await db.execute(
+                        _insert_ignore(user_role),
+                        [{"user_id": user_id, "role_id": role_id} for role_id in sorted(add_ids)],
+                    )
+                    added = max(result.rowcount, 0)
+                if remove_ids:
+                    result = await db.execute(
+                        delete(user_role).where(user_role.c.user_id == user_id, user_role.c.role_id.in_(remove_ids))
+                    )
+                    removed = result.rowcount
+                
+                await db.commit()
+                
+                # 只清除该用户的权限缓存（提交成功后随工作单元一次性刷新）
+                if added or removed:
+                    await invalidate_user_permissions(user_id, batch=batch)
+                
+                logger.info(f"用户角色更新成功: 用户ID {user_id}, 添加: {sorted(add_ids)}, 移除: {sorted(remove_ids)}")
+                return {"added": added, "removed": removed, "missing": []}
         except SQLAlchemyError as e:
-            db.rollback()
-            logger.error(f"用户角色分配失败, 用户ID: {user_id}, 错误: {e}")
+            await db.rollback()
+            logger.error(f"用户角色更新失败, 用户ID: {user_id}, 错误: {e}")
             return None
+    
+    @staticmethod
+    async def assign_user_roles(db: AsyncSession, user_id: int, role_ids: List[int]) -> Optional[Dict[str, Any]]:
+        """为用户分配角色（替换为给定的角色集合）
+        
+        与当前角色求差后交给 update_user_roles，不存在的角色ID忽略
+        
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            role_ids: 角色ID列表
+            
+        Returns:
+            Optional[Dict[str, Any]]: 变更结果，如果用户不存在则返回None
+        """
+        wanted = set((await db.execute(select(Role.id).where(Role.id.in_(role_ids)))).scalars().all()) if role_ids else set()
+        current = set((await db.execute(
+            select(user_role.c.role_id).where(user_role.c.user_id == user_id)
+        )).scalars().all())
+        return await RoleService.update_user_roles(db, user_id, add=wanted - current, remove=current - wanted)
+    
+    @staticmethod
+    async def bulk_assign_user_roles(db: AsyncSession, pairs: Iterable[Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+        """批量为用户添加角色
+        
+        先用集合查询校验全部用户与角色，再按 RBAC_BULK_CHUNK_SIZE 分批写入：每批先查出已存在的
+        关联，只对新增的关联执行一条多行 INSERT 并单独提交。全部完成后在一次 Redis 管道中
+        使实际新增了角色的用户的权限缓存失效，用户数超过 RBAC_TARGETED_INVALIDATION_MAX_USERS 时
+        改为使整个 user_permissions 命名空间失效
+        
+        Args:
+            db: 数据库会话
+            pairs: (用户ID, 角色ID) 列表
+            
+        Returns:
+            Optional[Dict[str, Any]]: 实际新增的关联数 added、权限缓存被失效的用户数 users，以及不存在的用户ID missing_users、
+                角色ID missing_roles（存在时不做任何修改）；写入失败时返回None，此前已提交的批次保留，
+                重试是幂等的
+        """
+        pairs = sorted(set(pairs))
+        user_ids = {user_id for user_id, _ in pairs}
+        role_ids = {role_id for _, role_id in pairs}
+        chunk_size = settings.RBAC_BULK_CHUNK_SIZE
+        
+        missing_users = sorted(user_ids - await _existing_ids(db, User.id, user_ids, chunk_size))
+        missing_roles = sorted(role_ids - await _existing_ids(db, Role.id, role_ids, chunk_size))
+        if missing_users or missing_roles:
+            logger.warning(f"批量分配角色校验失败, 不存在的用户: {missing_users}, 角色: {missing_roles}")
+            return {"added": 0, "users": 0, "missing_users": missing_users, "missing_roles": missing_roles}
+        
+        added = 0
+        affected = set()
+        async with invalidation_batch() as batch:
+            try:
+                for start in range(0, len(pairs), chunk_size):
+                    chunk = pairs[start:start + chunk_size]
+                    chunk_users = {user_id for user_id, _ in chunk}
+                    existing = set((await db.execute(
+                        select(user_role.c.user_id, user_role.c.role_id).where(user_role.c.user_id.in_(chunk_users))
+                    )).tuples().all())
+                    rows = [{"user_id": user_id, "role_id": role_id} for user_id, role_id in chunk if (user_id, role_id) not in existing]
+                    if not rows:
+                        continue
+                    
+                    # 查询与写入之间可能有并发写入，冲突的行忽略，按实际插入行数计数
+                    result = await db.execute(_insert_ignore(user_role).values(rows))
+                    await db.commit()
+                    inserted = max(result.rowcount, 0)
+                    if not inserted:
+                        continue
+                    added += inserted
+                    # 部分行冲突时无法确定具体是哪些行，使本批全部用户失效（并发写入方也会使其失效）
+                    affected.update(row["user_id"] for row in rows)
+            except SQLAlchemyError as e:
+                await db.rollback()
+                logger.error(f"批量分配角色失败, 已新增关联: {added}, 错误: {e}")
+                return None
+            finally:
+                # 已提交批次的缓存失效仍随工作单元刷新
+                await _invalidate_user_ids(batch, affected)
+        
+        logger.info(f"批量分配角色成功, 新增关联: {added}, 受影响用户: {len(affected)}")
+        return {"added": added, "users": len(affected), "missing_users": [], "missing_roles": []}
 
 
 # 权限服务
 class PermissionService:
     @staticmethod
-    @async_cache("permissions", 3600)
-    async def get_permissions(db: Session, skip: int = 0, limit: int = 100) -> List[Permission]:
-        """获取所有权限
+    @async_cache("permissions", 3600, stale_ttl=60, lock=True, codec="bytes")
+    async def get_permissions_json(db: AsyncSession, skip: int = 0, limit: int = 100) -> bytes:
+        """获取所有权限，返回序列化后的 JSON
         
         Args:
             db: 数据库会话
@@ -212,34 +550,99 @@ class PermissionService:
             limit: 返回记录数
             
         Returns:
-            List[Permission]: 权限列表
+            bytes: 权限列表 JSON
         """
         try:
-            return db.query(Permission).offset(skip).limit(limit).all()
+            result = await db.execute(select(Permission).order_by(Permission.id).offset(skip).limit(limit))
+            permissions = _permission_list_adapter.validate_python(result.scalars().all(), from_attributes=True)
+            return _permission_list_adapter.dump_json(permissions)
         except SQLAlchemyError as e:
             logger.error(f"获取权限列表失败: {e}")
-            return []
+            return b"[]"
     
     @staticmethod
-    @async_cache("permission", 3600)
-    async def get_permission(db: Session, permission_id: int) -> Optional[Permission]:
-        """根据ID获取权限
+    @async_cache("permissions", 3600, stale_ttl=60, lock=True, codec="msgpack")
+    async def get_permissions_page_json(db: AsyncSession, after_id: int = 0, limit: int = 100) -> Tuple[bytes, Optional[str]]:
+        """按主键游标分页获取权限，返回序列化后的 JSON 与下一页游标
+        
+        多取一条记录判断是否还有下一页；缓存值用 msgpack 编码，命中时为列表而非元组
+        
+        Args:
+            db: 数据库会话
+            after_id: 上一页最后一个权限的ID，第一页为 0
+            limit: 返回记录数
+            
+        Returns:
+            Tuple[bytes, Optional[str]]: 权限列表 JSON，下一页游标（没有下一页时为None）
+        """
+        if limit < 1:
+            return b"[]", None
+        try:
+            result = await db.execute(
+                select(Permission).where(Permission.id > after_id).order_by(Permission.id).limit(limit + 1)
+            )
+            rows = result.scalars().all()
+            next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+            permissions = _permission_list_adapter.validate_python(rows[:limit], from_attributes=True)
+            return _permission_list_adapter.dump_json(permissions), next_cursor
+        except SQLAlchemyError as e:
+            logger.error(f"获取权限列表失败: {e}")
+            return b"[]", None
+    
+    @staticmethod
+    async def get_permissions(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[PermissionSchema]:
+        """获取所有权限
+        
+        Args:
+            db: 数据库会话
+            skip: 跳过记录数
+            limit: 返回记录数
+            
+        Returns:
+            List[PermissionSchema]: 权限列表
+        """
+        return _permission_list_adapter.validate_json(
+            await PermissionService.get_permissions_json(db, skip=skip, limit=limit)
+        )
+    
+    @staticmethod
+    @async_cache("permission", 3600, stale_ttl=60, lock=True, codec="bytes")
+    async def get_permission_json(db: AsyncSession, permission_id: int) -> Optional[bytes]:
+        """根据ID获取权限，返回序列化后的 JSON
         
         Args:
             db: 数据库会话
             permission_id: 权限ID
             
         Returns:
-            Optional[Permission]: 权限对象，如果不存在则返回None
+            Optional[bytes]: 权限 JSON，如果不存在则返回None
         """
         try:
-            return db.query(Permission).filter(Permission.id == permission_id).first()
+            result = await db.execute(select(Permission).where(Permission.id == permission_id))
+            permission = result.scalars().first()
+            if permission is None:
+                return None
+            return PermissionSchema.model_validate(permission).model_dump_json().encode()
         except SQLAlchemyError as e:
             logger.error(f"获取权限失败, ID: {permission_id}, 错误: {e}")
             return None
     
     @staticmethod
-    async def create_permission(db: Session, permission_create: PermissionCreate) -> Optional[Permission]:
+    async def get_permission(db: AsyncSession, permission_id: int) -> Optional[PermissionSchema]:
+        """根据ID获取权限
+        
+        Args:
+            db: 数据库会话
+            permission_id: 权限ID
+            
+        Returns:
+            Optional[PermissionSchema]: 权限，如果不存在则返回None
+        """
+        permission_json = await PermissionService.get_permission_json(db, permission_id=permission_id)
+        return PermissionSchema.model_validate_json(permission_json) if permission_json is not None else None
+    
+    @staticmethod
+    async def create_permission(db: AsyncSession, permission_create: PermissionCreate) -> Optional[Permission]:
         """创建权限
         
         Args:
@@ -249,28 +652,36 @@ class PermissionService:
         Returns:
             Optional[Permission]: 创建的权限对象，如果失败则返回None
         """
-        try:
-            db_permission = Permission(
-                name=permission_create.name,
-                description=permission_create.description
-            )
-            db.add(db_permission)
-            db.commit()
-            db.refresh(db_permission)
-            
-            # 清除缓存
-            await clear_cache("permissions:*")
-            await clear_cache("permission:*")
-            
-            logger.info(f"权限创建成功: {db_permission.name} (ID: {db_permission.id})")
-            return db_permission
-        except SQLAlchemyError as e:
-            db.rollback()
-            logger.error(f"权限创建失败: {e}")
-            return None
+        for attempt in range(_BIT_ALLOCATION_ATTEMPTS):
+            try:
+                async with invalidation_batch() as batch:
+                    db_permission = Permission(
+                        name=permission_create.name,
+                        description=permission_create.description,
+                        bit=(await allocate_bits(db, 1))[0]
+                    )
+                    db.add(db_permission)
+                    await db.commit()
+                    
+                    # 清除缓存（提交成功后随工作单元一次性刷新）
+                    batch.namespace("permissions", "permission")
+                    
+                    logger.info(f"权限创建成功: {db_permission.name} (ID: {db_permission.id}, 位: {db_permission.bit})")
+                    return db_permission
+            except IntegrityError as e:
+                await db.rollback()
+                # 位编号序列被并发初始化时重新分配；权限名重复则直接失败
+                name_taken = await db.scalar(select(Permission.id).where(Permission.name == permission_create.name))
+                if name_taken is not None or attempt == _BIT_ALLOCATION_ATTEMPTS - 1:
+                    logger.error(f"权限创建失败: {e}")
+                    return None
+            except SQLAlchemyError as e:
+                await db.rollback()
+                logger.error(f"权限创建失败: {e}")
+                return None
     
     @staticmethod
-    async def update_permission(db: Session, permission_id: int, permission_update: PermissionUpdate) -> Optional[Permission]:
+    async def update_permission(db: AsyncSession, permission_id: int, permission_update: PermissionUpdate) -> Optional[Permission]:
         """更新权限
         
         Args:
@@ -282,34 +693,36 @@ class PermissionService:
             Optional[Permission]: 更新后的权限对象，如果不存在则返回None
         """
         try:
-            db_permission = db.query(Permission).filter(Permission.id == permission_id).first()
-            if not db_permission:
-                logger.warning(f"权限不存在, ID: {permission_id}")
-                return None
-            
-            update_data = permission_update.dict(exclude_unset=True)
-            for key, value in update_data.items():
-                setattr(db_permission, key, value)
-            
-            db.commit()
-            db.refresh(db_permission)
-            
-            # 清除缓存
-            await clear_cache("permissions:*")
-            await clear_cache("permission:*")
-            await clear_cache("user_permissions:*")  # 清除用户权限缓存
-            
-            logger.info(f"权限更新成功: {db_permission.name} (ID: {db_permission.id})")
-            return db_permission
+            async with invalidation_batch() as batch:
+                result = await db.execute(select(Permission).where(Permission.id == permission_id))
+                db_permission = result.scalars().first()
+                if not db_permission:
+                    logger.warning(f"权限不存在, ID: {permission_id}")
+                    return None
+                
+                update_data = permission_update.dict(exclude_unset=True)
+                for key, value in update_data.items():
+                    setattr(db_permission, key, value)
+                
+                await db.commit()
+                
+                # 清除缓存（提交成功后随工作单元一次性刷新）
+                # 角色缓存中包含权限信息，需要一并失效；用户权限掩码按 bit 列计算，更新不改变位编号，不受影响
+                batch.namespace("permissions", "permission", "roles", "role")
+                
+                logger.info(f"权限更新成功: {db_permission.name} (ID: {db_permission.id})")
+                return db_permission
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"权限更新失败, ID: {permission_id}, 错误: {e}")
             return None
     
     @staticmethod
-    async def delete_permission(db: Session, permission_id: int) -> bool:
+    async def delete_permission(db: AsyncSession, permission_id: int) -> bool:
         """删除权限
         
+        一条 DELETE 语句完成，角色-权限关联由数据库外键级联删除，不加载关联集合
+        
         Args:
             db: 数据库会话
             permission_id: 权限ID
@@ -318,23 +731,24 @@ class PermissionService:
             bool: 是否删除成功
         """
         try:
-            db_permission = db.query(Permission).filter(Permission.id == permission_id).first()
-            if not db_permission:
-                logger.warning(f"权限不存在, ID: {permission_id}")
-                return False
-            
-            permission_name = db_permission.name
-            db.delete(db_permission)
-            db.commit()
-            
-            # 清除缓存
-            await clear_cache("permissions:*")
-            await clear_cache("permission:*")
-            await clear_cache("user_permissions:*")  # 清除用户权限缓存
-            
-            logger.info(f"权限删除成功: {permission_name} (ID: {permission_id})")
-            return True
+            async with invalidation_batch() as batch:
+                permission_name = await db.scalar(select(Permission.name).where(Permission.id == permission_id))
+                if permission_name is None:
+                    logger.warning(f"权限不存在, ID: {permission_id}")
+                    return False
+                
+                # 关联行将被级联删除，先查出受影响的用户
+                await _invalidate_users(db, batch, _permission_users(permission_id))
+                await db.execute(delete(Permission).where(Permission.id == permission_id))
+                await db.commit()
+                
+                # 清除缓存（提交成功后随工作单元一次性刷新）
+                # 角色缓存中包含权限信息，需要一并失效
+                batch.namespace("permissions", "permission", "roles", "role")
+                
+                logger.info(f"权限删除成功: {permission_name} (ID: {permission_id})")
+                return True
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"权限删除失败, ID: {permission_id}, 错误: {e}")
             return False 
\ No newline at end of file
@@ -1,8 +1,13 @@
+import logging
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.base import AsyncSessionLocal
 from app.models.domain.user import User
 from app.models.schemas.user import UserCreate
-from app.utils.security import get_password_hash, verify_password
+from app.utils.hashing import password_hasher
+
+logger = logging.getLogger(__name__)
 
 class UserService:
     """用户服务类
@@ -11,7 +16,7 @@ class UserService:
     """
     
     @staticmethod
-    def get_by_username(db: Session, username: str) -> Optional[User]:
+    async def get_by_username(db: AsyncSession, username: str) -> Optional[User]:
         """通过用户名获取用户
         
         Args:
@@ -21,22 +26,28 @@ class UserService:
         Returns:
             Optional[User]: 如果找到用户则返回用户对象，否则返回 None
         """
-        return db.query(User).filter(User.username == username).first()
+        result = await db.execute(select(User).where(User.username == username))
+        return result.scalars().first()
     
     @staticmethod
-    def create(db: Session, user_in: UserCreate) -> User:
+    async def create(db: AsyncSession, user_in: UserCreate) -> User:
         """创建新用户
         
+        密码哈希在独立的进程池中计算
+        
         Args:
             db: 数据库会话
             user_in: 用户创建数据
             
         Returns:
             User: 创建的用户对象
+            
+        Raises:
+            APIException: 密码哈希执行器繁忙时抛出
         """
         user = User(
             username=user_in.username,
-            hashed_password=get_password_hash(user_in.password),
+            hashed_password=await password_hasher.hash(user_in.password),
             email=user_in.email,
             full_name=user_in.full_name
         )
@@ -46,14 +57,17 @@ class UserService:
             user.is_superuser = True
             
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         return user
     
     @staticmethod
-    def authenticate(db: Session, username: str, password: str) -> Optional[User]:
+    async def authenticate(db: AsyncSession, username: str, password: str) -> Optional[User]:
         """验证用户凭据
         
+        密码校验在独立的进程池中执行；存储的哈希成本或算法与当前配置不同时，
+        登录成功后用新哈希替换，使登录的计算开销始终由 PASSWORD_HASH_ROUNDS 决定
+        
         Args:
             db: 数据库会话
             username: 用户名
@@ -61,10 +75,36 @@ class UserService:
             
         Returns:
             Optional[User]: 如果验证成功则返回用户对象，否则返回 None
+            
+        Raises:
+            APIException: 密码哈希执行器繁忙时抛出
         """
-        user = UserService.get_by_username(db, username)
+        user = await UserService.get_by_username(db, username)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
-        return user 
\ No newline at end of file
+        if new_hash:
+            await UserService._upgrade_password_hash(user.id, user.username, new_hash)
+        return user
+    
+    @staticmethod
+    async def _upgrade_password_hash(user_id: int, username: str, new_hash: str) -> None:
+        """在独立会话中写入升级后的密码哈希
+        
+        不使用登录请求的会话，写入失败时的回滚不会使已加载的用户对象过期
+        
+        Args:
+            user_id: 用户ID
+            username: 用户名（仅用于日志）
+            new_hash: 新的密码哈希
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(User).where(User.id == user_id).values(hashed_password=new_hash))
+                await db.commit()
+            logger.info(f"用户密码哈希已升级: {username} (ID: {user_id})")
+        except Exception as e:
+            # 升级失败不影响本次登录，下次登录时重试
+            logger.error(f"用户密码哈希升级失败: {e}") 
\ No newline at end of file
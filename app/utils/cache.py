@@ -1,16 +1,302 @@
 import json
-import pickle
+import time
+import uuid
+import asyncio
+import fnmatch
+import hashlib
+import inspect
 import logging
-from typing import Any, Optional, TypeVar, Callable, Union
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, TypeVar, Callable, Union, Sequence, Dict, List, Set, Tuple
 from functools import wraps
-from app.core.redis import get_async_redis
+from fastapi import Request, Response, BackgroundTasks
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.redis import CircuitOpenError, get_async_redis, redis_breaker
+from app.utils.serializers import Codec, encode, decode, get_codec, get_compressor
 
 logger = logging.getLogger(__name__)
 T = TypeVar("T")
 
+# 缓存键最大长度，超过后对参数部分做哈希
+MAX_KEY_LENGTH = 200
+
+# 不参与缓存键计算的参数名与参数类型（会话、请求等非数据参数）
+SKIP_ARG_NAMES = frozenset({"self", "cls", "db", "session", "request", "response", "background_tasks"})
+SKIP_ARG_TYPES = (Session, AsyncSession, Request, Response, BackgroundTasks)
+
+# 命名空间版本号键，每个缓存前缀对应一个版本号，版本号是缓存键的一部分
+NAMESPACE_VERSION_KEY = "cache_ns:{prefix}"
+
+# 跨进程重建锁键
+LOCK_KEY = "cache_lock:{key}"
+
+# 等待其他进程重建缓存时的轮询间隔（秒）
+LOCK_POLL_INTERVAL = 0.05
+
+# 仅当锁仍由自己持有时才释放
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+KeyBuilder = Callable[..., Any]
+
+_MISSING = object()
+
+
+class LocalCache:
+    """进程内 LRU 缓存
+    
+    作为 Redis 之前的一级缓存，容量有界，按 LRU 淘汰，条目按 TTL 过期。
+    缓存的是反序列化后的对象本身，调用方不应修改返回值
+    
+    Args:
+        max_size: 最大条目数
+        ttl: 默认过期时间（秒）
+    """
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # 失效纪元，每次收到失效消息递增；读取 Redis 期间纪元变化则不回填，避免写入过期数据
+        self.epoch = 0
+    
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        """获取缓存值，未命中或已过期时返回 default"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存值，超出容量时淘汰最久未使用的条目"""
+        self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+    
+    def delete(self, key: str) -> None:
+        """删除单个条目"""
+        self._data.pop(key, None)
+    
+    def delete_pattern(self, pattern: str) -> None:
+        """删除匹配通配符模式的所有条目"""
+        for key in [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]:
+            del self._data[key]
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# 进程内一级缓存
+local_cache = LocalCache(settings.CACHE_LOCAL_MAX_SIZE, settings.CACHE_LOCAL_TTL)
+
+# 命名空间失效回调，用于同步依赖该命名空间的进程内状态（如权限位注册表）
+_namespace_hooks: Dict[str, List[Callable[[], None]]] = {}
+
+# 进程内正在计算中的缓存键，用于合并同一键的并发未命中
+_inflight: Dict[str, asyncio.Future] = {}
+
+# 失效消息订阅任务，仅在订阅成功期间启用一级缓存，保证各进程间的一致性
+_listener_task: Optional[asyncio.Task] = None
+_listener_ready = False
+
+
+def _local_cache_active() -> bool:
+    """一级缓存是否可用（已启用且失效消息订阅正常）"""
+    return settings.CACHE_LOCAL_ENABLED and _listener_ready
+
+
+def on_namespace_invalidated(prefix: str, callback: Callable[[], None]) -> None:
+    """注册命名空间失效回调
+    
+    本进程或其他进程使该命名空间失效时（经由发布订阅消息），回调在本进程内被调用
+    
+    Args:
+        prefix: 缓存前缀（命名空间）
+        callback: 无参同步回调
+    """
+    _namespace_hooks.setdefault(prefix, []).append(callback)
+
+
+def _run_namespace_hooks(prefixes: Sequence[str]) -> None:
+    for prefix in prefixes:
+        for callback in _namespace_hooks.get(prefix, []):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"命名空间失效回调执行失败: {prefix}, {e}")
+
+
+def _apply_invalidation(message: Dict[str, Any]) -> None:
+    """在本进程内执行一条失效消息"""
+    local_cache.epoch += 1
+    kind = message.get("type")
+    if kind in ("namespace", "keys", "batch"):
+        prefixes = message.get("prefixes", [])
+        # 一级缓存键都带命名空间版本号，删除本地版本号即可使旧条目不可达，由 LRU/TTL 淘汰，
+        # 不逐个扫描一级缓存
+        for prefix in prefixes:
+            local_cache.delete(NAMESPACE_VERSION_KEY.format(prefix=prefix))
+        for key in message.get("keys", []):
+            local_cache.delete(key)
+        _run_namespace_hooks(prefixes)
+    elif kind == "pattern":
+        local_cache.delete_pattern(message.get("pattern", "*"))
+    else:
+        local_cache.clear()
+        _run_namespace_hooks(list(_namespace_hooks))
+
+
+async def _publish_invalidation(redis_client, message: Dict[str, Any]) -> None:
+    """本进程立即失效，并广播给其他进程"""
+    _apply_invalidation(message)
+    try:
+        await redis_client.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+    except Exception as e:
+        logger.error(f"缓存失效消息发布失败: {e}")
+
+
+async def _listen_invalidations() -> None:
+    """订阅失效消息并应用到一级缓存，连接中断时清空一级缓存并重连"""
+    global _listener_ready
+    retry_delay = 1
+    while True:
+        pubsub = None
+        try:
+            redis_client = await get_async_redis()
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            _listener_ready = True
+            retry_delay = 1
+            logger.info("缓存失效消息订阅已启动")
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    _apply_invalidation(json.loads(message["data"]))
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"无法解析缓存失效消息: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"缓存失效消息订阅中断: {e}, {retry_delay}秒后重试")
+        finally:
+            # 订阅中断期间可能错过失效消息，一级缓存不再可信
+            _listener_ready = False
+            local_cache.clear()
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+        await asyncio.sleep(retry_delay)
+        retry_delay = min(retry_delay * 2, 30)
+
+
+async def start_invalidation_listener() -> None:
+    """启动缓存失效消息订阅（应用启动时调用）"""
+    global _listener_task
+    if not settings.CACHE_LOCAL_ENABLED or _listener_task is not None:
+        return
+    _listener_task = asyncio.create_task(_listen_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    """停止缓存失效消息订阅（应用关闭时调用）"""
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except asyncio.CancelledError:
+        pass
+    _listener_task = None
+
+
+def _normalize_arg(value: Any) -> str:
+    """将参数转换为稳定的字符串表示
+    
+    避免使用对象默认的 repr（包含内存地址），保证同一参数在不同请求、不同进程中得到相同结果
+    
+    Args:
+        value: 参数值
+        
+    Returns:
+        str: 稳定的字符串表示
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_normalize_arg(v) for v in value) + "]"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(_normalize_arg(v) for v in value)) + "}"
+    if isinstance(value, dict):
+        items = sorted((str(k), _normalize_arg(v)) for k, v in value.items())
+        return "{" + ",".join(f"{k}={v}" for k, v in items) + "}"
+    if isinstance(value, BaseModel):
+        return _normalize_arg(value.model_dump())
+    # ORM 实例等带主键的对象，使用 类名#ID 表示
+    obj_id = getattr(value, "id", None)
+    if obj_id is not None:
+        return f"{type(value).__name__}#{obj_id}"
+    logger.warning(f"缓存键参数类型 {type(value).__name__} 没有稳定表示，请为缓存声明 key_fields 或 key_builder")
+    return str(value)
+
+
+def _resolve_field(arguments: Dict[str, Any], field: str) -> Any:
+    """按点号路径从参数中取值，如 "user.id"
+    """
+    name, *attrs = field.split(".")
+    value = arguments[name]
+    for attr in attrs:
+        value = getattr(value, attr)
+    return value
+
+
+def _is_skipped(name: str, value: Any) -> bool:
+    """判断参数是否为会话、请求等不参与缓存键的参数"""
+    return name in SKIP_ARG_NAMES or isinstance(value, SKIP_ARG_TYPES)
+
+
+def _finalize_key(prefix: str, parts: Sequence[str]) -> str:
+    """拼接缓存键，超长时对参数部分做哈希"""
+    body = ":".join(parts)
+    key = f"{prefix}:{body}" if body else prefix
+    if len(key) > MAX_KEY_LENGTH:
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        key = f"{prefix}:#{digest}"
+    return key
+
+
 def generate_cache_key(prefix: str, *args, **kwargs) -> str:
     """生成缓存键
     
+    会话、请求等非数据参数会被跳过，其余参数转换为稳定的字符串表示
+    
     Args:
         prefix: 缓存键前缀
         args: 位置参数
@@ -19,70 +305,479 @@ def generate_cache_key(prefix: str, *args, **kwargs) -> str:
     Returns:
         str: 生成的缓存键
     """
-    key_parts = [prefix]
+    key_parts = []
     
     # 添加位置参数
     for arg in args:
-        key_parts.append(str(arg))
+        if isinstance(arg, SKIP_ARG_TYPES):
+            continue
+        key_parts.append(_normalize_arg(arg))
     
     # 添加关键字参数（按键排序）
     for k in sorted(kwargs.keys()):
-        key_parts.append(f"{k}:{kwargs[k]}")
+        if _is_skipped(k, kwargs[k]):
+            continue
+        key_parts.append(f"{k}={_normalize_arg(kwargs[k])}")
+    
+    return _finalize_key(prefix, key_parts)
+
+
+def versioned_key(prefix: str, key: str, version: int) -> str:
+    """在缓存键的前缀后插入命名空间版本号
+    
+    Args:
+        prefix: 缓存键前缀（命名空间）
+        key: 不含版本号的缓存键，以 prefix 开头
+        version: 命名空间版本号
+        
+    Returns:
+        str: 形如 prefix:v{version}:... 的实际缓存键
+    """
+    return f"{prefix}:v{version}{key[len(prefix):]}"
+
+
+async def get_namespace_version(prefix: str) -> int:
+    """获取命名空间当前版本号
     
-    return ":".join(key_parts)
+    Args:
+        prefix: 缓存键前缀（命名空间）
+        
+    Returns:
+        int: 版本号，未初始化时为0
+    """
+    version_key = NAMESPACE_VERSION_KEY.format(prefix=prefix)
+    use_local = _local_cache_active()
+    if use_local:
+        version = local_cache.get(version_key)
+        if version is not _MISSING:
+            return version
+    
+    epoch = local_cache.epoch
+    redis_client = await get_async_redis()
+    version = await redis_client.get(version_key)
+    version = int(version) if version else 0
+    if use_local and epoch == local_cache.epoch:
+        local_cache.set(version_key, version)
+    return version
 
 
-def async_cache(prefix: str, expire: int = 3600):
+class InvalidationBatch:
+    """缓存失效工作单元
+    
+    收集一次业务操作中需要失效的命名空间与缓存条目，提交后通过一次 Redis 事务管道
+    完成全部 INCR、DEL 与失效消息发布
+    
+    Example:
+        async with invalidation_batch() as batch:
+            ...
+            await db.commit()
+            batch.namespace("roles", "role")
+    """
+    
+    def __init__(self):
+        # 用 dict 保持插入顺序并去重
+        self.prefixes: Dict[str, None] = {}
+        self.entries: Dict[Tuple[str, str], None] = {}
+        self.deleted = 0
+    
+    def __bool__(self) -> bool:
+        return bool(self.prefixes or self.entries)
+    
+    def namespace(self, *prefixes: str) -> "InvalidationBatch":
+        """使命名空间下的所有缓存失效"""
+        for prefix in prefixes:
+            self.prefixes[prefix] = None
+        return self
+    
+    def entry(self, cached_func: Callable, *args, **kwargs) -> "InvalidationBatch":
+        """使 async_cache 装饰的函数在指定参数下的缓存条目失效"""
+        self.entries[(cached_func.cache_prefix, cached_func.cache_key(*args, **kwargs))] = None
+        return self
+    
+    async def flush(self) -> Dict[str, int]:
+        """执行并清空已收集的失效操作
+        
+        Returns:
+            Dict[str, int]: 各命名空间的新版本号，失败时为空字典
+        """
+        if not self:
+            return {}
+        prefixes = list(self.prefixes)
+        bumped = set(prefixes)
+        entries = list(self.entries)
+        self.prefixes.clear()
+        self.entries.clear()
+        try:
+            redis_client = await get_async_redis()
+            # 所在命名空间同时失效的条目无需单独删除
+            keys = []
+            versions: Dict[str, int] = {}
+            for prefix, key in entries:
+                if prefix in bumped:
+                    continue
+                if prefix not in versions:
+                    versions[prefix] = await get_namespace_version(prefix)
+                keys.append(versioned_key(prefix, key, versions[prefix]))
+            
+            message = {"type": "batch", "prefixes": prefixes, "keys": keys}
+            _apply_invalidation(message)
+            async with redis_client.pipeline(transaction=True) as pipe:
+                for prefix in prefixes:
+                    pipe.incr(NAMESPACE_VERSION_KEY.format(prefix=prefix))
+                if keys:
+                    pipe.delete(*keys)
+                pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+                results = await pipe.execute()
+            
+            self.deleted = results[len(prefixes)] if keys else 0
+            if prefixes:
+                logger.info(f"缓存命名空间已失效: {', '.join(prefixes)}")
+            return dict(zip(prefixes, results))
+        except Exception as e:
+            logger.error(f"缓存失效失败: {e}")
+            return {}
+    
+    def flush_in_background(self) -> None:
+        """后台执行失效操作，调用方无需等待 Redis
+        
+        本进程的一级缓存立即失效，其他进程在后台任务完成后失效
+        """
+        if not self:
+            return
+        _apply_invalidation({"type": "namespace", "prefixes": list(self.prefixes)})
+        batch = InvalidationBatch()
+        batch.prefixes, batch.entries = dict(self.prefixes), dict(self.entries)
+        self.prefixes.clear()
+        self.entries.clear()
+        task = asyncio.create_task(batch.flush())
+        _background_flushes.add(task)
+        task.add_done_callback(_background_flushes.discard)
+
+
+# 后台失效任务，持有引用避免被垃圾回收
+_background_flushes: Set[asyncio.Task] = set()
+
+
+@asynccontextmanager
+async def invalidation_batch(background: Optional[bool] = None) -> AsyncIterator[InvalidationBatch]:
+    """缓存失效工作单元
+    
+    代码块正常结束时刷新已收集的失效操作；代码块抛出异常（如提交失败）时丢弃
+    
+    Args:
+        background: 是否在后台刷新，默认使用 CACHE_INVALIDATION_BACKGROUND
+    """
+    batch = InvalidationBatch()
+    yield batch
+    if background if background is not None else settings.CACHE_INVALIDATION_BACKGROUND:
+        batch.flush_in_background()
+    else:
+        await batch.flush()
+
+
+async def drain_background_invalidations() -> None:
+    """等待后台失效任务完成（应用关闭时调用）"""
+    if _background_flushes:
+        await asyncio.gather(*_background_flushes, return_exceptions=True)
+
+
+async def invalidate_namespace(*prefixes: str) -> Dict[str, int]:
+    """使命名空间下的所有缓存失效
+    
+    每个命名空间只需一次 INCR，旧版本的缓存不再被读取，随 TTL 自然过期，
+    代价与缓存规模无关；INCR 与失效消息在同一个管道中发送
+    
+    Args:
+        prefixes: 需要失效的缓存前缀
+        
+    Returns:
+        Dict[str, int]: 各命名空间的新版本号，失败时为空字典
+    """
+    return await InvalidationBatch().namespace(*prefixes).flush()
+
+
+# 全局压缩配置
+_compressor = get_compressor(settings.CACHE_COMPRESSION)
+
+
+def _dumps(value: Any, fresh_until: Optional[float], codec: Codec) -> bytes:
+    """序列化缓存数据，附带新鲜期截止时间"""
+    return encode(
+        value,
+        codec,
+        fresh_until=fresh_until,
+        compressor=_compressor,
+        compress_threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+    )
+
+
+def _loads(cached_data: bytes) -> Any:
+    """反序列化缓存数据
+    
+    Returns:
+        Any: (新鲜期截止时间, 缓存值)，截止时间为 None 表示始终新鲜；数据无效时返回 _MISSING
+    """
+    try:
+        return decode(cached_data)
+    except Exception as e:
+        logger.warning(f"缓存数据解码失败: {e}, 视为未命中")
+        return _MISSING
+
+
+def _is_fresh(fresh_until: Optional[float]) -> bool:
+    return fresh_until is None or fresh_until > time.time()
+
+
+async def _single_flight(key: str, factory: Callable[[], Any]) -> Any:
+    """合并同一键的并发调用，只有第一个调用方执行 factory，其余调用方等待其结果
+    
+    Args:
+        key: 缓存键
+        factory: 无参异步函数
+        
+    Returns:
+        Any: factory 的返回值
+    """
+    future = _inflight.get(key)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # 执行方被取消时由当前调用方自行计算；当前调用方被取消时继续抛出
+            if future.cancelled():
+                return await factory()
+            raise
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await factory()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # 标记异常已被获取，避免无等待方时 asyncio 报告未处理异常
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(key, None)
+
+
+async def _acquire_lock(redis_client, cache_key: str, timeout: float) -> Optional[str]:
+    """获取跨进程重建锁，成功时返回锁令牌"""
+    token = uuid.uuid4().hex
+    acquired = await redis_client.set(LOCK_KEY.format(key=cache_key), token, nx=True, px=int(timeout * 1000))
+    return token if acquired else None
+
+
+async def _release_lock(redis_client, cache_key: str, token: str) -> None:
+    """释放跨进程重建锁"""
+    try:
+        await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, LOCK_KEY.format(key=cache_key), token)
+    except Exception as e:
+        logger.warning(f"缓存重建锁释放失败: {e}")
+
+
+async def _wait_for_fill(redis_client, cache_key: str, timeout: float) -> Any:
+    """等待持锁的其他进程写入缓存
+    
+    Returns:
+        Any: 新写入的缓存值；超时或持锁方已放弃时返回 _MISSING
+    """
+    deadline = time.monotonic() + timeout
+    lock_key = LOCK_KEY.format(key=cache_key)
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(cache_key)
+            pipe.exists(lock_key)
+            cached_data, locked = await pipe.execute()
+        decoded = _loads(cached_data) if cached_data else _MISSING
+        if decoded is not _MISSING:
+            fresh_until, value = decoded
+            if _is_fresh(fresh_until):
+                return value
+        if not locked:
+            break
+    return _MISSING
+
+
+def make_key_function(
+    func: Callable,
+    prefix: str,
+    key_builder: Optional[KeyBuilder] = None,
+    key_fields: Optional[Sequence[str]] = None,
+) -> Callable[..., str]:
+    """为被缓存函数构造缓存键函数
+    
+    优先级: key_builder > key_fields > 按函数签名自动生成（跳过会话等非数据参数，补全默认值）
+    
+    Args:
+        func: 被缓存的函数
+        prefix: 缓存键前缀
+        key_builder: 自定义键函数，接收与 func 相同的参数，返回值会被规范化后拼接到前缀后
+        key_fields: 参与缓存键的参数名，支持点号路径，如 ["user.id"]
+        
+    Returns:
+        Callable[..., str]: 接收与 func 相同参数、返回缓存键的函数
+    """
+    signature = inspect.signature(func)
+    
+    def build_key(*args, **kwargs) -> str:
+        if key_builder is not None:
+            return _finalize_key(prefix, [_normalize_arg(key_builder(*args, **kwargs))])
+        
+        bound = signature.bind_partial(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+        
+        if key_fields is not None:
+            parts = [f"{field}={_normalize_arg(_resolve_field(arguments, field))}" for field in key_fields]
+            return _finalize_key(prefix, parts)
+        
+        parts = [
+            f"{name}={_normalize_arg(value)}"
+            for name, value in arguments.items()
+            if not _is_skipped(name, value)
+        ]
+        return _finalize_key(prefix, parts)
+    
+    return build_key
+
+
+def async_cache(
+    prefix: str,
+    expire: int = 3600,
+    key_builder: Optional[KeyBuilder] = None,
+    key_fields: Optional[Sequence[str]] = None,
+    local: bool = True,
+    local_ttl: Optional[int] = None,
+    stale_ttl: int = 0,
+    lock: bool = False,
+    lock_timeout: float = 10,
+    codec: Optional[str] = None,
+):
     """异步缓存装饰器
     
     Args:
         prefix: 缓存键前缀
         expire: 过期时间（秒）
+        key_builder: 自定义缓存键函数，接收与被装饰函数相同的参数
+        key_fields: 参与缓存键的参数名（支持点号路径，如 "user.id"）
+        local: 是否使用进程内一级缓存
+        local_ttl: 一级缓存过期时间（秒），默认使用 CACHE_LOCAL_TTL，且不超过 expire
+        stale_ttl: 过期后仍保留旧值的时间（秒），期间只有一个调用方重建缓存，
+            其余调用方直接返回旧值；0 表示不返回旧值
+        lock: 是否使用 Redis 跨进程锁，保证各进程中只有一个调用方重建缓存
+        lock_timeout: 跨进程锁超时时间，也是未持锁方等待重建结果的最长时间（秒）
+        codec: 编解码器名称（pickle/json/msgpack/bytes），默认使用 CACHE_CODEC
         
     Returns:
-        Callable: 装饰器函数
+        Callable: 装饰器函数，被装饰函数附带 cache_prefix 属性以及 cache_key(*args, **kwargs) 与
+            invalidate(*args, **kwargs) 方法
+    
+    缓存键包含命名空间版本号，调用 invalidate_namespace(prefix) 即可使该前缀下的缓存全部失效。
+    同一进程内同一缓存键的并发未命中会被合并为一次调用
     """
     def decorator(func):
+        build_key = make_key_function(func, prefix, key_builder=key_builder, key_fields=key_fields)
+        l1_ttl = min(local_ttl if local_ttl is not None else settings.CACHE_LOCAL_TTL, expire)
+        value_codec = get_codec(codec or settings.CACHE_CODEC)
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            # 熔断器打开时直接绕过缓存，不等待 Redis 超时
+            if redis_breaker.is_open:
+                return await func(*args, **kwargs)
+            
             try:
-                # 生成缓存键
-                cache_key = generate_cache_key(prefix, *args, **kwargs)
-                
                 # 获取Redis客户端
                 redis_client = await get_async_redis()
+                epoch = local_cache.epoch
+                
+                # 生成缓存键（包含命名空间版本号）
+                version = await get_namespace_version(prefix)
+                cache_key = versioned_key(prefix, build_key(*args, **kwargs), version)
+                
+                # 尝试从一级缓存获取
+                use_local = local and _local_cache_active()
+                if use_local:
+                    value = local_cache.get(cache_key)
+                    if value is not _MISSING:
+                        return value
                 
                 # 尝试从缓存获取
+                stale_value = _MISSING
                 cached_data = await redis_client.get(cache_key)
-                if cached_data:
+                decoded = _loads(cached_data) if cached_data else _MISSING
+                if decoded is not _MISSING:
+                    fresh_until, value = decoded
+                    if _is_fresh(fresh_until):
+                        if use_local and epoch == local_cache.epoch:
+                            local_cache.set(cache_key, value, l1_ttl)
+                        return value
+                    stale_value = value
+                    # 已有调用方在重建，直接返回旧值
+                    if cache_key in _inflight:
+                        return stale_value
+            except Exception as e:
+                if isinstance(e, CircuitOpenError):
+                    logger.debug(f"Redis熔断中，绕过缓存: {prefix}")
+                else:
+                    logger.error(f"异步缓存读取异常: {e}")
+                # 缓存不可用时直接执行原函数
+                return await func(*args, **kwargs)
+            
+            async def rebuild() -> Tuple[Any, bool]:
+                token = None
+                if lock:
                     try:
-                        return pickle.loads(cached_data)
+                        token = await _acquire_lock(redis_client, cache_key, lock_timeout)
+                        if token is None:
+                            # 其他进程正在重建：有旧值时返回旧值，否则等待其结果
+                            if stale_value is not _MISSING:
+                                return stale_value, False
+                            value = await _wait_for_fill(redis_client, cache_key, lock_timeout)
+                            if value is not _MISSING:
+                                return value, True
                     except Exception as e:
-                        logger.debug(f"Pickle反序列化失败: {e}, 尝试JSON解析")
-                        try:
-                            return json.loads(cached_data)
-                        except Exception as e:
-                            logger.debug(f"JSON解析失败: {e}, 返回原始数据")
-                            return cached_data
-                
-                # 缓存未命中，执行原函数
-                result = await func(*args, **kwargs)
-                
-                # 缓存结果
+                        # 锁不可用时不加锁重建
+                        logger.warning(f"缓存重建锁不可用: {e}")
                 try:
-                    await redis_client.setex(cache_key, expire, pickle.dumps(result))
-                except Exception as e:
-                    logger.debug(f"Pickle序列化失败: {e}, 尝试JSON序列化")
+                    # 缓存未命中，执行原函数；原函数的异常直接抛出，不会再次执行
+                    result = await func(*args, **kwargs)
+                    
+                    # 缓存结果
+                    fresh_until = time.time() + expire if stale_ttl else None
                     try:
-                        await redis_client.setex(cache_key, expire, json.dumps(result))
+                        await redis_client.setex(
+                            cache_key, expire + stale_ttl, _dumps(result, fresh_until, value_codec)
+                        )
                     except Exception as e:
                         logger.warning(f"缓存设置失败: {e}")
-                
-                return result
-            except Exception as e:
-                logger.error(f"异步缓存操作异常: {e}")
-                # 出现异常时直接执行原函数
-                return await func(*args, **kwargs)
+                    return result, True
+                finally:
+                    if token is not None:
+                        await _release_lock(redis_client, cache_key, token)
+            
+            result, fresh = await _single_flight(cache_key, rebuild)
+            if fresh and use_local and epoch == local_cache.epoch:
+                local_cache.set(cache_key, result, l1_ttl)
+            return result
+        
+        async def invalidate(*args, **kwargs) -> int:
+            """删除指定参数对应的缓存条目"""
+            batch = InvalidationBatch().entry(wrapper, *args, **kwargs)
+            await batch.flush()
+            return batch.deleted
+        
+        wrapper.cache_prefix = prefix
+        wrapper.cache_key = build_key
+        wrapper.invalidate = invalidate
         return wrapper
     return decorator
 
@@ -90,6 +785,9 @@ def async_cache(prefix: str, expire: int = 3600):
 async def clear_cache(pattern: str = "*") -> int:
     """清除缓存
     
+    使用 SCAN 增量遍历，不会像 KEYS 一样阻塞 Redis。业务代码中的缓存失效应优先使用
+    invalidate_namespace，本函数适用于运维或测试场景下的按模式清理
+    
     Args:
         pattern: 缓存键模式，支持通配符，默认清除所有缓存
         
@@ -102,11 +800,17 @@ async def clear_cache(pattern: str = "*") -> int:
             logger.error("Redis连接失败，无法清除缓存")
             return 0
         
-        keys = await redis_client.keys(pattern)
-        if not keys:
-            return 0
+        count = 0
+        batch = []
+        async for key in redis_client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                count += await redis_client.delete(*batch)
+                batch = []
+        if batch:
+            count += await redis_client.delete(*batch)
+        await _publish_invalidation(redis_client, {"type": "pattern", "pattern": pattern})
         
-        count = await redis_client.delete(*keys)
         logger.info(f"已清除{count}个缓存: {pattern}")
         return count
     except Exception as e:
@@ -0,0 +1,122 @@
+"""
+密码哈希执行器
+
+bcrypt 是 CPU 密集型计算，放在默认线程池中会与其他同步接口争抢线程并受 GIL 限制。
+这里使用独立的进程池执行哈希与校验，并限制排队数量：排队已满时立即返回服务不可用，
+避免登录洪峰拖垮其他接口
+"""
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.exceptions import APIException
+from app.models.schemas.common import ErrorCode
+from app.models.schemas.messages import ErrorMessages
+from app.utils.security import get_password_hash, verify_and_update_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """密码哈希执行器
+
+    Args:
+        max_workers: 工作进程数，为 0 时在线程池中执行
+        max_pending: 同时提交（执行中与排队中）的任务上限
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    def start(self) -> None:
+        """创建进程池，应用启动时调用，未调用时在首次使用时创建"""
+        if self._executor is None and self.max_workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"密码哈希进程池已启动: {self.max_workers} 个工作进程")
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("密码哈希进程池已关闭")
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        """提交任务到执行器
+
+        Raises:
+            APIException: 排队已满或进程池不可用时抛出
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"密码哈希排队已满 ({self.pending}/{self.max_pending})，拒绝请求")
+            raise APIException(
+                code=ErrorCode.SERVICE_UNAVAILABLE,
+                message=ErrorMessages.PASSWORD_HASHER_BUSY
+            )
+
+        self.pending += 1
+        try:
+            if self.max_workers <= 0:
+                return await run_in_threadpool(func, *args)
+            self.start()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        except BrokenProcessPool:
+            # 工作进程异常退出，丢弃进程池，下次使用时重建
+            logger.error("密码哈希进程池已损坏，将在下次使用时重建")
+            self._executor = None
+            raise APIException(
+                code=ErrorCode.SERVICE_UNAVAILABLE,
+                message=ErrorMessages.SERVICE_UNAVAILABLE
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """计算密码哈希
+
+        Args:
+            password: 明文密码
+
+        Returns:
+            str: 哈希后的密码
+        """
+        return await self._submit(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """校验密码
+
+        Args:
+            plain_password: 明文密码
+            hashed_password: 哈希后的密码
+
+        Returns:
+            bool: 密码是否匹配
+        """
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """校验密码，存储的哈希成本或算法与当前配置不同时同时计算新哈希
+
+        Args:
+            plain_password: 明文密码
+            hashed_password: 哈希后的密码
+
+        Returns:
+            Tuple[bool, Optional[str]]: 密码是否匹配，以及需要替换的新哈希（无需替换时为 None）
+        """
+        return await self._submit(verify_and_update_password, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
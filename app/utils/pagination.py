@@ -0,0 +1,53 @@
+"""
+主键游标分页
+
+游标是对上一页最后一条记录主键的不透明编码。下一页查询为 WHERE id > 游标 ORDER BY id LIMIT n，
+借助主键索引直接定位，耗时与页深度无关；同一游标总是对应同一个查询，缓存键可在请求间复用
+"""
+import base64
+import binascii
+from typing import Optional
+from app.core.exceptions import APIException
+from app.models.schemas.common import ErrorCode
+from app.models.schemas.messages import ErrorMessages
+
+# 游标格式版本，格式变化时旧游标按无效处理
+_CURSOR_PREFIX = "k1:"
+
+
+def encode_cursor(last_id: int) -> str:
+    """将上一页最后一条记录的主键编码为游标
+
+    Args:
+        last_id: 主键
+
+    Returns:
+        str: URL 安全的游标
+    """
+    raw = f"{_CURSOR_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """解析游标
+
+    Args:
+        cursor: 游标，为空时表示第一页
+
+    Returns:
+        int: 上一页最后一条记录的主键，第一页为 0
+
+    Raises:
+        APIException: 游标无效
+    """
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        if raw.startswith(_CURSOR_PREFIX):
+            last_id = int(raw[len(_CURSOR_PREFIX):])
+            if last_id >= 0:
+                return last_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        pass
+    raise APIException(code=ErrorCode.PARAM_ERROR, message=ErrorMessages.INVALID_CURSOR)
@@ -0,0 +1,222 @@
+"""
+权限位注册表
+
+为每个权限分配固定的位编号，用户的有效权限可以表示为一个整数位掩码，
+权限检查变为一次按位与运算，与用户拥有的权限数量无关。
+
+位编号保存在 permission 表的 bit 列中，创建权限时由 permission_bit_sequence 单调分配，
+与自增主键无关；编号持久化后在各进程间一致，且不会因增删其他权限而变化。已删除权限的
+编号不会分配给新权限，失效消息丢失时仍残留的旧掩码或令牌声明不会因此获得无关的新权限。
+"""
+import time
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.base import AsyncSessionLocal
+from app.models.domain.role import Permission, permission_bit_sequence
+from app.utils.cache import on_namespace_invalidated
+
+logger = logging.getLogger(__name__)
+
+
+def mask_from_bits(bits: Iterable[int]) -> int:
+    """由位编号集合构造位掩码"""
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
+
+
+def bits_from_mask(mask: int) -> List[int]:
+    """将位掩码拆分为位编号列表"""
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+
+async def allocate_bits(db: AsyncSession, count: int) -> List[int]:
+    """为新权限分配位编号，编号只增不减，从不复用
+    
+    在调用方的事务中递增 permission_bit_sequence，行锁使并发分配串行化，事务回滚时
+    序列随之回滚。序列行不存在时（未经迁移直接建表）按已有最大编号初始化，并发初始化
+    由主键约束拒绝，调用方重试即可
+    
+    Args:
+        db: 数据库会话
+        count: 需要的编号数量
+        
+    Returns:
+        List[int]: 位编号列表
+    """
+    sequence = permission_bit_sequence
+    result = await db.execute(
+        update(sequence).where(sequence.c.id == 1).values(next_bit=sequence.c.next_bit + count)
+    )
+    if result.rowcount:
+        next_bit = await db.scalar(select(sequence.c.next_bit).where(sequence.c.id == 1))
+    else:
+        max_bit = await db.scalar(select(func.max(Permission.bit)))
+        next_bit = (max_bit + 1 if max_bit is not None else 0) + count
+        await db.execute(insert(sequence).values(id=1, next_bit=next_bit))
+    return list(range(next_bit - count, next_bit))
+
+
+class PermissionRegistry:
+    """权限名与位编号的双向映射
+    
+    Args:
+        refresh_interval: 自动重新加载间隔（秒），作为失效消息丢失时的兜底
+        min_reload_interval: 强制重新加载的最小间隔（秒），避免未知权限导致频繁查询
+    """
+    def __init__(self, refresh_interval: int = 300, min_reload_interval: int = 5):
+        self.refresh_interval = refresh_interval
+        self.min_reload_interval = min_reload_interval
+        self._bits: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._all_mask = 0
+        self._loaded_at: Optional[float] = None
+        self._failed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        # 每次重新加载递增，预编译的权限掩码据此判断是否需要重新编译
+        self.version = 0
+    
+    def load(self, rows: Iterable[Tuple[int, str]]) -> None:
+        """加载 (位编号, 权限名) 映射"""
+        bits = {name: bit for bit, name in rows}
+        self._bits = bits
+        self._names = {bit: name for name, bit in bits.items()}
+        self._all_mask = mask_from_bits(bits.values())
+        self._loaded_at = time.monotonic()
+        self.version += 1
+    
+    def invalidate(self) -> None:
+        """标记注册表需要重新加载"""
+        self._loaded_at = None
+        self._failed_at = None
+    
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval
+    
+    async def ensure_loaded(self, force: bool = False) -> None:
+        """确保注册表已加载且未过期
+        
+        强制重新加载与加载失败后的重试间隔均不小于 min_reload_interval，
+        数据库不可用时沿用已加载的映射（未加载过时所有权限视为未知）
+        
+        Args:
+            force: 是否强制重新加载
+        """
+        now = time.monotonic()
+        if not self.is_stale:
+            if not force or now - self._loaded_at < self.min_reload_interval:
+                return
+        if self._failed_at is not None and now - self._failed_at < self.min_reload_interval:
+            return
+        version = self.version
+        async with self._lock:
+            # 等待锁期间其他调用方已完成加载
+            if self.version != version and not self.is_stale:
+                return
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(select(Permission.bit, Permission.name))
+                    self.load(result.all())
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                logger.error(f"权限位注册表加载失败: {e}")
+                return
+            self._failed_at = None
+            logger.debug(f"权限位注册表已加载, 共 {len(self._bits)} 个权限")
+    
+    def bit(self, name: str) -> Optional[int]:
+        """获取权限的位编号，未知权限返回 None"""
+        return self._bits.get(name)
+    
+    def mask_of(self, names: Iterable[str]) -> Tuple[int, bool]:
+        """计算权限名集合对应的位掩码
+        
+        Returns:
+            Tuple[int, bool]: (位掩码, 是否所有权限均已知)
+        """
+        mask = 0
+        known = True
+        for name in names:
+            bit = self._bits.get(name)
+            if bit is None:
+                known = False
+            else:
+                mask |= 1 << bit
+        return mask, known
+    
+    def names_of(self, mask: int) -> List[str]:
+        """将位掩码转换为权限名列表（忽略未知位）"""
+        return sorted(self._names[bit] for bit in bits_from_mask(mask) if bit in self._names)
+    
+    def has_unknown_bits(self, mask: int) -> bool:
+        """位掩码中是否包含注册表未知的位（说明注册表已过期）"""
+        return bool(mask & ~self._all_mask)
+    
+    @property
+    def all_mask(self) -> int:
+        return self._all_mask
+
+
+class CompiledPermissions:
+    """预编译的权限要求
+    
+    在依赖创建时声明，首次检查时编译为位掩码，注册表重新加载后自动重新编译
+    
+    Args:
+        names: 需要的权限名
+        registry: 权限位注册表
+    """
+    def __init__(self, names: Iterable[str], registry: "PermissionRegistry"):
+        self.names = frozenset(names)
+        self._registry = registry
+        self._version = -1
+        self._mask = 0
+        self._known = False
+        # 权限缺失时强制重新加载的退避：每次仍缺失则间隔翻倍，直到 refresh_interval
+        self._retry_at = 0.0
+        self._retry_interval = registry.min_reload_interval
+    
+    async def mask(self) -> Tuple[int, bool]:
+        """获取位掩码
+        
+        Returns:
+            Tuple[int, bool]: (位掩码, 是否所有权限均已知)
+        """
+        registry = self._registry
+        await registry.ensure_loaded()
+        if self._version != registry.version:
+            self._mask, self._known = registry.mask_of(self.names)
+            self._version = registry.version
+        if not self._known and time.monotonic() >= self._retry_at:
+            # 可能是新创建的权限，强制重新加载；仍缺失（如权限目录同步失败）时退避，避免每次检查都查询数据库
+            await registry.ensure_loaded(force=True)
+            self._mask, self._known = registry.mask_of(self.names)
+            self._version = registry.version
+            if self._known:
+                self._retry_interval = registry.min_reload_interval
+            else:
+                self._retry_at = time.monotonic() + self._retry_interval
+                self._retry_interval = min(self._retry_interval * 2, registry.refresh_interval)
+        return self._mask, self._known
+    
+    async def is_satisfied_by(self, user_mask: int) -> bool:
+        """用户位掩码是否包含全部所需权限"""
+        mask, known = await self.mask()
+        return known and user_mask & mask == mask
+
+
+# 全局权限位注册表
+permission_registry = PermissionRegistry()
+
+# 权限增删改会使 permissions 命名空间失效，此时重新加载注册表
+on_namespace_invalidated("permissions", permission_registry.invalidate)
@@ -1,12 +1,22 @@
-from typing import List, Optional, Callable, Any
+from typing import Dict, Iterable, List, Mapping, Optional, Callable, Any, Tuple, Union
+from dataclasses import dataclass
+from types import MappingProxyType
 import logging
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from jose import JWTError
+from pydantic import ValidationError
 from fastapi_permissions import Allow, Deny, Everyone, Authenticated, configure_permissions
-from sqlalchemy.orm import Session
-from app.db.base import get_db
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.base import AsyncSessionLocal
 from app.models.domain.user import User
-from app.utils.security import get_current_user
-from app.utils.cache import async_cache
+from app.models.domain.role import Permission
+from app.core.config import settings
+from app.utils.security import Principal, decode_access_token, oauth2_scheme
+from app.utils.cache import InvalidationBatch, async_cache, get_namespace_version, invalidate_namespace
+from app.services.permission_resolver import PermissionResolver
+from app.utils.permission_registry import CompiledPermissions, allocate_bits, permission_registry
 
 logger = logging.getLogger(__name__)
 
@@ -47,16 +57,331 @@ class Permissions:
     MESSAGE_DELETE = "message:delete"
     
     @classmethod
-    def get_all_permissions(cls) -> List[str]:
+    def get_all_permissions(cls) -> Tuple[str, ...]:
         """获取所有权限列表
         
         Returns:
-            List[str]: 所有权限的列表
+            Tuple[str, ...]: 所有权限值（如 "user:create"），导入时预先计算
         """
-        return [p for p in dir(cls) if not p.startswith("_") and isinstance(getattr(cls, p), str)]
+        return ALL_PERMISSIONS
+
+
+@dataclass(frozen=True)
+class PermissionMeta:
+    """权限元数据
+    
+    属性:
+        value: 权限值，如 "user:create"
+        attr: Permissions 中的常量名，如 "USER_CREATE"
+        resource: 资源，如 "user"
+        action: 操作，如 "create"
+        description: 权限描述
+    """
+    value: str
+    attr: str
+    resource: str
+    action: str
+    description: str
+
+
+# 权限描述用的资源与操作名称
+_RESOURCE_LABELS = {
+    "user": "用户",
+    "role": "角色",
+    "permission": "权限",
+    "rule": "自动回复规则",
+    "message": "消息",
+}
+_ACTION_LABELS = {
+    "create": "创建",
+    "read": "查看",
+    "update": "更新",
+    "delete": "删除",
+}
+
+
+def _build_catalog(cls: type) -> Mapping[str, PermissionMeta]:
+    """从权限常量类构建只读的权限目录（权限值 -> 元数据），按声明顺序排列"""
+    catalog: Dict[str, PermissionMeta] = {}
+    for attr, value in vars(cls).items():
+        if attr.startswith("_") or not isinstance(value, str):
+            continue
+        resource, _, action = value.partition(":")
+        description = f"{_ACTION_LABELS.get(action, action)}{_RESOURCE_LABELS.get(resource, resource)}"
+        catalog[value] = PermissionMeta(value, attr, resource, action, description)
+    return MappingProxyType(catalog)
+
+
+# 权限目录，导入时构建一次
+PERMISSION_CATALOG: Mapping[str, PermissionMeta] = _build_catalog(Permissions)
+ALL_PERMISSIONS: Tuple[str, ...] = tuple(PERMISSION_CATALOG)
+
+
+# 权限目录同步遇到并发冲突时的最多尝试次数
+_CATALOG_SYNC_ATTEMPTS = 3
+
+
+async def sync_permission_catalog() -> int:
+    """将权限目录同步到 permission 表，并加载权限位注册表（应用启动时调用）
+    
+    只补充缺失的权限，不修改或删除已有数据
+    
+    Returns:
+        int: 新增的权限数量
+    """
+    try:
+        added = []
+        async with AsyncSessionLocal() as db:
+            for _ in range(_CATALOG_SYNC_ATTEMPTS):
+                result = await db.execute(select(Permission.name).where(Permission.name.in_(ALL_PERMISSIONS)))
+                existing = set(result.scalars().all())
+                missing = [meta for value, meta in PERMISSION_CATALOG.items() if value not in existing]
+                if not missing:
+                    break
+                # 按目录顺序分配位编号
+                bits = await allocate_bits(db, len(missing))
+                db.add_all(
+                    Permission(name=meta.value, description=meta.description, bit=bit)
+                    for meta, bit in zip(missing, bits)
+                )
+                try:
+                    await db.commit()
+                    added = missing
+                    break
+                except IntegrityError:
+                    # 多个进程同时启动时，其他进程可能已插入同名权限或占用了相同的位编号，重新检查
+                    await db.rollback()
+        missing = added
+        if missing:
+            await invalidate_namespace("permissions", "permission")
+            logger.info(f"已同步 {len(missing)} 个权限到数据库: {[meta.value for meta in missing]}")
+        await permission_registry.ensure_loaded(force=True)
+        return len(missing)
+    except Exception as e:
+        logger.error(f"同步权限目录失败: {e}")
+        return 0
+
+
+# 位掩码布局版本，位编号的分配方式变化时递增，使旧布局的缓存掩码与令牌声明不再被使用
+MASK_LAYOUT = 2
+
+
+@async_cache(
+    "user_permissions", 300, codec="pickle",  # 缓存5分钟，按用户ID缓存
+    key_builder=lambda user_id, db=None: (MASK_LAYOUT, user_id),
+)
+async def get_user_permission_mask(user_id: int, db: Optional[AsyncSession] = None) -> int:
+    """获取用户有效权限位掩码（不含超级管理员的全部权限）
+    
+    位编号为权限的 bit 列，缓存中每个用户只存一个整数
+    
+    Args:
+        user_id: 用户ID
+        db: 可选的数据库会话，传入时复用该会话，不参与缓存键
+        
+    Returns:
+        int: 权限位掩码
+    """
+    # 一次连接查询解析有效权限，不在事件循环中触发关系懒加载
+    if db is not None:
+        return await PermissionResolver.resolve_mask(db, user_id)
+    async with AsyncSessionLocal() as db:
+        return await PermissionResolver.resolve_mask(db, user_id)
+
+
+def _authz_namespace(user_id: int) -> str:
+    """用户授权版本号所在的缓存命名空间"""
+    return f"authz:{user_id}"
+
+
+async def get_authz_version(user_id: int) -> str:
+    """获取用户当前授权版本号
+    
+    由位掩码布局版本、全局用户权限命名空间版本号与用户自身的版本号组成，任意一方变化都会使
+    令牌中携带的权限声明失效。版本号读取经过进程内缓存，通常无需访问 Redis
+    
+    Args:
+        user_id: 用户ID
+        
+    Returns:
+        str: 授权版本号
+    """
+    global_version = await get_namespace_version("user_permissions")
+    user_version = await get_namespace_version(_authz_namespace(user_id))
+    return f"{MASK_LAYOUT}.{global_version}.{user_version}"
+
+
+async def invalidate_user_permissions(*user_ids: int, batch: Optional[InvalidationBatch] = None) -> None:
+    """使指定用户的权限缓存与令牌中的权限声明失效
+    
+    Args:
+        user_ids: 用户ID
+        batch: 缓存失效工作单元，传入时只加入该工作单元，由调用方统一刷新；
+            否则立即在一次 Redis 管道中完成
+    """
+    target = batch if batch is not None else InvalidationBatch()
+    for user_id in user_ids:
+        target.entry(get_user_permission_mask, user_id)
+    target.namespace(*(_authz_namespace(user_id) for user_id in user_ids))
+    if batch is None:
+        await target.flush()
+
+
+async def build_permission_claims(user: User) -> Dict[str, Any]:
+    """构造访问令牌中的权限声明
+    
+    Args:
+        user: 用户对象
+        
+    Returns:
+        Dict[str, Any]: 权限声明，未启用 JWT_EMBED_PERMISSIONS 或无法获取授权版本号时为空字典
+    """
+    if not settings.JWT_EMBED_PERMISSIONS:
+        return {}
+    # 先取版本号再取掩码，期间发生的变更会使版本号不一致，从而回源数据库
+    try:
+        version = await get_authz_version(user.id)
+    except Exception as e:
+        logger.warning(f"获取授权版本号失败，令牌不携带权限声明: {e}")
+        return {}
+    mask = 0 if user.is_superuser else await get_user_permission_mask(user.id)
+    return {
+        "pm": format(mask, "x"),
+        "rv": version,
+        "act": bool(user.is_active),
+        "su": bool(user.is_superuser),
+    }
+
+
+# request.state 上未缓存用户对象时的哨兵值，用户不存在时缓存为 None
+_UNSET = object()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="无效的认证凭据",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class UserNotFoundError(HTTPException):
+    """令牌有效但对应的用户已不存在
+    
+    默认按无效凭据（401）处理；需要区分该情况的依赖可捕获后改为其他响应
+    """
+    
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的认证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def resolve_principal(request: Request, token: str) -> Principal:
+    """解析当前请求的身份，结果缓存在 request.state 上
+    
+    同一请求内的所有认证与权限依赖共享一次解析结果：令牌只解码一次，
+    数据库最多查询一次。令牌携带权限声明且授权版本号一致时，直接使用声明中的
+    信息，不访问数据库；否则在同一会话中查询用户并解析权限，查到的用户对象
+    一并缓存，供后续需要用户对象的依赖使用
+    
+    Args:
+        request: 当前请求
+        token: JWT令牌
+        
+    Returns:
+        Principal: 当前身份
+        
+    Raises:
+        HTTPException: 令牌无效时抛出
+        UserNotFoundError: 从数据库解析时用户不存在
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+    
+    try:
+        token_data = decode_access_token(token)
+    except (JWTError, ValidationError):
+        raise _credentials_exception()
+    if token_data.sub is None:
+        raise _credentials_exception()
+    
+    user_id = token_data.sub
+    if settings.JWT_EMBED_PERMISSIONS and token_data.has_permission_claims:
+        try:
+            version = await get_authz_version(user_id)
+        except Exception as e:
+            # 无法确认授权版本号（如 Redis 熔断中），不信任令牌中的声明
+            logger.warning(f"获取授权版本号失败，回源数据库: {e}")
+            version = None
+        if version is not None and version == token_data.rv:
+            principal = Principal(
+                user_id=user_id,
+                is_active=token_data.act,
+                is_superuser=token_data.su,
+                permission_mask=int(token_data.pm, 16),
+                authz_version=version,
+            )
+            request.state.principal = principal
+            return principal
+    
+    # 未携带声明或版本号不一致，回源数据库，用户与权限在同一会话中查询
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if user is None:
+            request.state.user = None
+            raise UserNotFoundError()
+        mask = 0 if user.is_superuser else await get_user_permission_mask(user.id, db=db)
+    principal = Principal(
+        user_id=user.id,
+        is_active=bool(user.is_active),
+        is_superuser=bool(user.is_superuser),
+        permission_mask=mask,
+    )
+    request.state.user = user
+    request.state.principal = principal
+    return principal
+
+
+async def load_principal_user(request: Request, principal: Principal) -> Optional[User]:
+    """获取当前身份对应的用户对象，结果缓存在 request.state 上
+    
+    身份从数据库解析时用户对象已被缓存，不会再次查询
+    
+    Args:
+        request: 当前请求
+        principal: 当前身份
+        
+    Returns:
+        Optional[User]: 用户对象，不存在时返回 None
+    """
+    user = getattr(request.state, "user", _UNSET)
+    if user is _UNSET:
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, principal.user_id)
+        request.state.user = user
+    return user
+
+
+async def get_current_principal(request: Request, token: str = Depends(oauth2_scheme)) -> Principal:
+    """获取当前身份
+    
+    Args:
+        request: 当前请求
+        token: JWT令牌
+        
+    Returns:
+        Principal: 当前身份
+        
+    Raises:
+        HTTPException: 令牌无效或用户不存在时抛出
+    """
+    return await resolve_principal(request, token)
 
 
-@async_cache("user_permissions", 300)  # 缓存5分钟
 async def get_user_permissions(user: User) -> List[str]:
     """获取用户权限列表
     
@@ -69,30 +394,58 @@ async def get_user_permissions(user: User) -> List[str]:
     try:
         if user.is_superuser:
             # 超级管理员拥有所有权限
-            return Permissions.get_all_permissions()
+            return list(ALL_PERMISSIONS)
         
-        return user.get_permissions()
+        mask = await get_user_permission_mask(user.id)
+        await permission_registry.ensure_loaded()
+        if permission_registry.has_unknown_bits(mask):
+            await permission_registry.ensure_loaded(force=True)
+        return permission_registry.names_of(mask)
     except Exception as e:
         logger.error(f"获取用户权限失败: {e}")
         return []
 
 
-async def get_active_principals(user: User = Depends(get_current_user)) -> List[str]:
+async def get_users_permissions(user_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """批量获取多个用户的权限列表（不含超级管理员的全部权限）
+    
+    Args:
+        user_ids: 用户ID集合
+        
+    Returns:
+        Dict[int, List[str]]: 用户ID到权限列表的映射
+    """
+    user_ids = list(user_ids)
+    try:
+        async with AsyncSessionLocal() as db:
+            masks = await PermissionResolver.resolve_masks(db, user_ids)
+        await permission_registry.ensure_loaded()
+        return {user_id: permission_registry.names_of(mask) for user_id, mask in masks.items()}
+    except Exception as e:
+        logger.error(f"批量获取用户权限失败: {e}")
+        return {user_id: [] for user_id in user_ids}
+
+
+async def get_active_principals(principal: Principal = Depends(get_current_principal)) -> List[str]:
     """获取用户权限主体
     
     Args:
-        user: 用户对象
+        principal: 当前身份
         
     Returns:
         List[str]: 用户的权限主体列表
     """
     try:
-        if user.is_active:
+        if principal.is_active:
             principals = [Everyone, Authenticated]
-            user_permissions = await get_user_permissions(user)
-            principals.extend(user_permissions)
-            if user.is_superuser:
+            if principal.is_superuser:
+                principals.extend(ALL_PERMISSIONS)
                 principals.append("superuser")
+            else:
+                await permission_registry.ensure_loaded()
+                if permission_registry.has_unknown_bits(principal.permission_mask):
+                    await permission_registry.ensure_loaded(force=True)
+                principals.extend(permission_registry.names_of(principal.permission_mask))
             return principals
         return [Everyone]
     except Exception as e:
@@ -100,11 +453,14 @@ async def get_active_principals(user: User = Depends(get_current_user)) -> List[
         return [Everyone]
 
 
-async def check_permissions(required_permissions: List[str], user: User) -> bool:
+async def check_permissions(
+    required_permissions: Union[List[str], CompiledPermissions],
+    user: User,
+) -> bool:
     """检查用户是否拥有所有指定权限
     
     Args:
-        required_permissions: 需要检查的权限列表
+        required_permissions: 需要检查的权限列表，或预编译的权限要求
         user: 用户对象
         
     Returns:
@@ -114,8 +470,10 @@ async def check_permissions(required_permissions: List[str], user: User) -> bool
         if user.is_superuser:
             return True
         
-        user_permissions = await get_user_permissions(user)
-        return all(perm in user_permissions for perm in required_permissions)
+        if not isinstance(required_permissions, CompiledPermissions):
+            required_permissions = CompiledPermissions(required_permissions, permission_registry)
+        user_mask = await get_user_permission_mask(user.id)
+        return await required_permissions.is_satisfied_by(user_mask)
     except Exception as e:
         logger.error(f"权限检查失败: {e}")
         return False
@@ -124,21 +482,30 @@ async def check_permissions(required_permissions: List[str], user: User) -> bool
 def require_permissions(required_permissions: List[str]) -> Callable:
     """要求用户拥有指定权限
     
+    所需权限在创建依赖时预编译为位掩码，检查时只需一次按位与运算
+    
     Args:
         required_permissions: 需要的权限列表
         
     Returns:
-        Callable: 权限检查依赖函数
+        Callable: 权限检查依赖函数，返回当前身份
     """
-    async def dependency(user: User = Depends(get_current_user)) -> User:
+    compiled = CompiledPermissions(required_permissions, permission_registry)
+    
+    async def dependency(principal: Principal = Depends(get_current_principal)) -> Principal:
         try:
-            if not await check_permissions(required_permissions, user):
-                logger.warning(f"用户 {user.username} (ID: {user.id}) 权限不足, 需要权限: {required_permissions}")
+            if not principal.is_active:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="用户未激活"
+                )
+            if not principal.is_superuser and not await compiled.is_satisfied_by(principal.permission_mask):
+                logger.warning(f"用户 (ID: {principal.user_id}) 权限不足, 需要权限: {required_permissions}")
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="权限不足"
                 )
-            return user
+            return principal
         except HTTPException:
             raise
         except Exception as e:
@@ -148,4 +515,30 @@ def require_permissions(required_permissions: List[str]) -> Callable:
                 detail="权限检查失败"
             )
     
-    return dependency 
\ No newline at end of file
+    return dependency
+
+
+async def require_superuser(principal: Principal = Depends(get_current_principal)) -> Principal:
+    """要求当前用户为已激活的超级管理员
+    
+    Args:
+        principal: 当前身份
+        
+    Returns:
+        Principal: 当前身份
+        
+    Raises:
+        HTTPException: 用户未激活或不是超级管理员时抛出
+    """
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="用户未激活"
+        )
+    if not principal.is_superuser:
+        logger.warning(f"用户 (ID: {principal.user_id}) 权限不足, 需要超级管理员")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="权限不足"
+        )
+    return principal
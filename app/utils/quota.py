@@ -0,0 +1,244 @@
+"""
+进程内令牌桶配额
+
+请求路径上只访问进程内的令牌桶，不访问 Redis。后台任务定期把各桶自上次同步以来的
+消耗量批量（一次 pipeline）累加到 Redis 中按固定窗口计数的键上，并用各进程的总消耗
+收紧本地桶的余量。多进程部署时，两次同步之间各进程可能共同超出配额，
+超出量不超过 同步间隔内的请求数 × 进程数，以此换取近乎为零的单请求开销
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+from fastapi import Depends, Request
+from app.core.config import settings
+from app.core.exceptions import APIException
+from app.core.redis import get_async_redis
+from app.models.schemas.common import ErrorCode
+from app.models.schemas.messages import ErrorMessages
+from app.utils.permissions import get_current_principal
+from app.utils.rate_limit import record_decision
+from app.utils.security import Principal
+
+logger = logging.getLogger(__name__)
+
+# 配额计数键：quota:{名称}:{标识}:{窗口序号}
+QUOTA_KEY = "quota:{name}:{identity}:{window}"
+
+
+class TokenBucket:
+    """令牌桶
+
+    Attributes:
+        tokens: 当前可用令牌数
+        updated_at: 上次补充令牌的时间（monotonic）
+        pending: 尚未同步到 Redis 的消耗量
+    """
+    __slots__ = ("tokens", "updated_at", "pending")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated_at = now
+        self.pending = 0
+
+
+class QuotaLimiter:
+    """进程内令牌桶配额
+
+    桶容量为 limit，按 limit / window 的速率补充令牌；同步时用 Redis 中当前窗口的
+    总消耗量收紧余量
+
+    Args:
+        name: 配额名称，作为 Redis 键的一部分
+        limit: 窗口内允许的请求数
+        window: 窗口长度（秒）
+        max_buckets: 最多保留的桶数量，超出时淘汰最久未使用的桶
+    """
+
+    def __init__(self, name: str, limit: int, window: int, max_buckets: int = 10000):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.rate = limit / window
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def bucket(self, identity: str) -> TokenBucket:
+        """获取标识对应的令牌桶，并按流逝时间补充令牌"""
+        now = time.monotonic()
+        bucket = self._buckets.get(identity)
+        if bucket is None:
+            bucket = TokenBucket(float(self.limit), now)
+            self._buckets[identity] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._trim(keep=identity)
+        else:
+            self._buckets.move_to_end(identity)
+            bucket.tokens = min(self.limit, bucket.tokens + (now - bucket.updated_at) * self.rate)
+            bucket.updated_at = now
+        return bucket
+
+    def allow(self, identity: str) -> bool:
+        """消耗一个令牌，令牌不足时返回 False"""
+        bucket = self.bucket(identity)
+        if bucket.tokens < 1:
+            return False
+        bucket.tokens -= 1
+        bucket.pending += 1
+        return True
+
+    def _trim(self, keep: Optional[str] = None) -> None:
+        """桶数量超出上限时淘汰最久未使用且没有待同步消耗的桶
+
+        有待同步消耗的桶保留到同步之后，避免丢失尚未累加到 Redis 的消耗量
+
+        Args:
+            keep: 不淘汰的标识（刚创建、即将消耗令牌的桶）
+        """
+        excess = len(self._buckets) - self.max_buckets
+        if excess <= 0:
+            return
+        evictable = []
+        for identity, bucket in self._buckets.items():
+            if bucket.pending == 0 and identity != keep:
+                evictable.append(identity)
+                if len(evictable) >= excess:
+                    break
+        for identity in evictable:
+            del self._buckets[identity]
+
+    def _evict_idle(self) -> None:
+        """淘汰已补满且没有待同步消耗的桶"""
+        now = time.monotonic()
+        idle = [
+            identity for identity, bucket in self._buckets.items()
+            if bucket.pending == 0 and bucket.tokens + (now - bucket.updated_at) * self.rate >= self.limit
+        ]
+        for identity in idle:
+            del self._buckets[identity]
+
+    async def sync(self, redis_client) -> None:
+        """将待同步消耗批量累加到 Redis，并用总消耗收紧本地余量"""
+        batch = [(identity, bucket, bucket.pending) for identity, bucket in self._buckets.items() if bucket.pending]
+        if batch:
+            window_id = int(time.time() // self.window)
+            pipe = redis_client.pipeline(transaction=False)
+            for identity, _, pending in batch:
+                key = QUOTA_KEY.format(name=self.name, identity=identity, window=window_id)
+                pipe.incrby(key, pending)
+                pipe.expire(key, self.window * 2)
+            results = await pipe.execute()
+
+            for (identity, bucket, pending), used in zip(batch, results[::2]):
+                # 同步期间产生的新消耗保留到下次同步
+                bucket.pending -= pending
+                bucket.tokens = min(bucket.tokens, max(0, self.limit - int(used)))
+        self._evict_idle()
+        self._trim()
+
+
+_limiters: List[QuotaLimiter] = []
+_sync_task: Optional[asyncio.Task] = None
+
+
+def register_quota(limiter: QuotaLimiter) -> QuotaLimiter:
+    """注册配额，使其参与后台同步"""
+    _limiters.append(limiter)
+    return limiter
+
+
+async def _sync_loop() -> None:
+    """后台同步所有配额"""
+    while True:
+        await asyncio.sleep(settings.QUOTA_SYNC_INTERVAL)
+        try:
+            redis_client = await get_async_redis()
+        except Exception as e:
+            logger.warning(f"配额同步获取 Redis 连接失败: {e}")
+            continue
+        for limiter in _limiters:
+            try:
+                await limiter.sync(redis_client)
+            except Exception as e:
+                # 同步失败时仅依赖本地令牌桶，待同步消耗保留到下次同步
+                record_decision(limiter.name, "sync_error")
+                logger.warning(f"配额同步失败: {limiter.name}, {e}")
+
+
+async def start_quota_sync() -> None:
+    """启动配额后台同步（应用启动时调用）"""
+    global _sync_task
+    if not settings.QUOTA_ENABLED or _sync_task is not None:
+        return
+    _sync_task = asyncio.create_task(_sync_loop())
+
+
+async def stop_quota_sync() -> None:
+    """停止配额后台同步（应用关闭时调用）"""
+    global _sync_task
+    if _sync_task is None:
+        return
+    _sync_task.cancel()
+    try:
+        await _sync_task
+    except asyncio.CancelledError:
+        pass
+    _sync_task = None
+
+
+def _route_name(request: Request) -> str:
+    """请求匹配的路由，如 GET:/api/v1/rbac/roles/{role_id}"""
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    return f"{request.method}:{path}"
+
+
+def require_quota(*quotas: Tuple[QuotaLimiter, bool]) -> Callable:
+    """配额依赖
+
+    按当前用户检查配额，所有配额都有余量时才消耗令牌。身份解析复用请求级缓存
+
+    Args:
+        quotas: (配额, 是否按路由区分) 列表；按路由区分时每个用户在每个路由上单独计数
+
+    Returns:
+        Callable: FastAPI 依赖函数，可用于路由或路由器的 dependencies
+    """
+    async def dependency(request: Request, principal: Principal = Depends(get_current_principal)) -> None:
+        if not settings.QUOTA_ENABLED:
+            return
+
+        route = _route_name(request)
+        buckets: Sequence[Tuple[QuotaLimiter, TokenBucket]] = [
+            (limiter, limiter.bucket(f"{principal.user_id}:{route}" if per_route else str(principal.user_id)))
+            for limiter, per_route in quotas
+        ]
+        exhausted = [limiter for limiter, bucket in buckets if bucket.tokens < 1]
+        if exhausted:
+            for limiter in exhausted:
+                record_decision(limiter.name, "limited")
+            limiter = exhausted[0]
+            logger.warning(f"用户 (ID: {principal.user_id}) 超出配额: {limiter.name}, {route}")
+            raise APIException(
+                code=ErrorCode.TOO_MANY_REQUESTS,
+                message=ErrorMessages.TOO_MANY_REQUESTS,
+                data={"retry_after": round(1 / limiter.rate, 3)}
+            )
+
+        for limiter, bucket in buckets:
+            bucket.tokens -= 1
+            bucket.pending += 1
+            record_decision(limiter.name, "allowed")
+
+    return dependency
+
+
+# RBAC 接口配额：每个用户在所有 RBAC 接口上的总配额，以及在单个接口上的配额
+rbac_user_quota = register_quota(QuotaLimiter(
+    "rbac:user", settings.RBAC_QUOTA_PER_USER, settings.RBAC_QUOTA_WINDOW, settings.QUOTA_MAX_BUCKETS
+))
+rbac_route_quota = register_quota(QuotaLimiter(
+    "rbac:route", settings.RBAC_QUOTA_PER_ROUTE, settings.RBAC_QUOTA_WINDOW, settings.QUOTA_MAX_BUCKETS
+))
+rbac_quota = require_quota((rbac_user_quota, False), (rbac_route_quota, True))
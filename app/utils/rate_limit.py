@@ -0,0 +1,239 @@
+"""
+基于 Redis 的滑动窗口限流
+
+每次检查通过一次 EVALSHA 调用完成：脚本在 Redis 内原子地清理各键窗口外的记录、
+判断是否超限，全部未超限时才为各键记录本次请求。同一请求可同时按客户端 IP、
+用户名等多个维度限流。Redis 不可用时放行请求（fail open），限流不成为单点故障
+"""
+import hashlib
+import logging
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from aioredis.exceptions import NoScriptError
+from fastapi import Request
+from app.core.config import settings
+from app.core.exceptions import APIException
+from app.core.redis import get_async_redis
+from app.models.schemas.common import ErrorCode
+from app.models.schemas.messages import ErrorMessages
+
+logger = logging.getLogger(__name__)
+
+# 限流键：ratelimit:{作用域}:{规则名}:{标识}
+RATE_LIMIT_KEY = "ratelimit:{scope}:{rule}:{identity}"
+
+# KEYS: 各维度的限流键
+# ARGV: 请求唯一标识, 之后每个键依次为 限额, 窗口毫秒数
+# 返回: {是否放行, 需等待的毫秒数, 剩余次数}
+_SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local member = ARGV[1]
+local retry = 0
+local remaining = -1
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', now - window)
+    local count = redis.call('ZCARD', KEYS[i])
+    if count >= limit then
+        local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        local wait = window
+        if oldest[2] then
+            wait = math.max(tonumber(oldest[2]) + window - now, 1)
+        end
+        retry = math.max(retry, wait)
+    else
+        local left = limit - count - 1
+        if remaining < 0 or left < remaining then
+            remaining = left
+        end
+    end
+end
+if retry > 0 then
+    return {0, retry, 0}
+end
+for i = 1, #KEYS do
+    redis.call('ZADD', KEYS[i], now, member)
+    redis.call('PEXPIRE', KEYS[i], tonumber(ARGV[2 * i + 1]))
+end
+return {1, 0, remaining}
+"""
+_SLIDING_WINDOW_SHA = hashlib.sha1(_SLIDING_WINDOW_SCRIPT.encode()).hexdigest()
+
+# 限流决策计数：(作用域, 决策) -> 次数，决策为 allowed / limited / fail_open / sync_error
+_decisions: Counter = Counter()
+
+
+def record_decision(scope: str, decision: str) -> None:
+    """记录一次限流决策"""
+    _decisions[(scope, decision)] += 1
+
+
+def get_rate_limit_stats() -> List[Dict[str, Any]]:
+    """获取本进程的限流与配额决策统计
+
+    计数为进程级，多进程部署时需按进程汇总
+
+    Returns:
+        List[Dict[str, Any]]: 每个 (作用域, 决策) 一条记录，包含 scope、decision 与 count
+    """
+    return [
+        {"scope": scope, "decision": decision, "count": count}
+        for (scope, decision), count in sorted(_decisions.items())
+    ]
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """限流规则
+
+    Attributes:
+        name: 规则名称，作为限流键的一部分
+        limit: 窗口内允许的请求数
+        window: 窗口长度（秒）
+        identify: 从请求中提取限流标识，返回 None 时该规则不生效
+    """
+    name: str
+    limit: int
+    window: int
+    identify: Callable[[Request], Awaitable[Optional[str]]]
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """限流检查结果"""
+    allowed: bool
+    retry_after: float = 0.0
+    remaining: int = -1
+    degraded: bool = False  # Redis 不可用，按放行处理
+
+
+async def client_ip(request: Request) -> Optional[str]:
+    """获取客户端 IP
+
+    RATE_LIMIT_TRUST_FORWARDED 开启时优先使用 X-Forwarded-For 的第一个地址，
+    仅应在可信反向代理之后开启
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def body_field(field: str) -> Callable[[Request], Awaitable[Optional[str]]]:
+    """从 JSON 请求体中提取限流标识
+
+    请求体由 Starlette 缓存，依赖中读取不影响路由函数的参数解析。字段值在参数校验之前读取，
+    可能任意长，因此规范化后取 SHA-1 摘要作为标识，限流键长度固定
+
+    Args:
+        field: 字段名
+
+    Returns:
+        Callable: 标识提取函数，字段缺失或请求体不是 JSON 对象时返回 None
+    """
+    async def identify(request: Request) -> Optional[str]:
+        try:
+            body = await request.json()
+        except Exception:
+            return None
+        value = body.get(field) if isinstance(body, dict) else None
+        if value is None:
+            return None
+        normalized = str(value).strip().lower()
+        if not normalized:
+            return None
+        return hashlib.sha1(normalized.encode()).hexdigest()
+
+    return identify
+
+
+def per_ip(limit: int, window: int) -> RateLimitRule:
+    """按客户端 IP 限流"""
+    return RateLimitRule("ip", limit, window, client_ip)
+
+
+def per_body_field(field: str, limit: int, window: int) -> RateLimitRule:
+    """按 JSON 请求体中的字段（如用户名）限流"""
+    return RateLimitRule(field, limit, window, body_field(field))
+
+
+async def hit(entries: Sequence[Tuple[str, int, int]]) -> RateLimitResult:
+    """原子地检查并记录一次请求
+
+    任一键超限时不记录，返回需等待的时间；Redis 不可用时放行
+
+    Args:
+        entries: (限流键, 限额, 窗口秒数) 列表
+
+    Returns:
+        RateLimitResult: 检查结果
+    """
+    if not entries:
+        return RateLimitResult(allowed=True)
+
+    keys: List[str] = []
+    args: List[object] = [uuid.uuid4().hex]
+    for key, limit, window in entries:
+        keys.append(key)
+        args.extend((limit, window * 1000))
+
+    try:
+        redis_client = await get_async_redis()
+        try:
+            allowed, retry_ms, remaining = await redis_client.evalsha(_SLIDING_WINDOW_SHA, len(keys), *keys, *args)
+        except NoScriptError:
+            # 脚本未加载（首次调用或 Redis 重启），加载后重试
+            await redis_client.script_load(_SLIDING_WINDOW_SCRIPT)
+            allowed, retry_ms, remaining = await redis_client.evalsha(_SLIDING_WINDOW_SHA, len(keys), *keys, *args)
+    except Exception as e:
+        logger.warning(f"限流检查失败，放行请求: {e}")
+        return RateLimitResult(allowed=True, degraded=True)
+
+    return RateLimitResult(allowed=bool(allowed), retry_after=int(retry_ms) / 1000, remaining=int(remaining))
+
+
+def rate_limit(scope: str, *rules: RateLimitRule) -> Callable:
+    """限流依赖
+
+    所有规则在一次 Redis 调用中检查，任一规则超限即拒绝请求
+
+    Args:
+        scope: 作用域，通常为路由名称，用于区分不同路由的限流键
+        rules: 限流规则
+
+    Returns:
+        Callable: FastAPI 依赖函数
+
+    Example:
+        @router.post("/login", dependencies=[Depends(rate_limit("login", per_ip(20, 60)))])
+    """
+    async def dependency(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        entries = []
+        for rule in rules:
+            identity = await rule.identify(request)
+            if identity is None:
+                continue
+            key = RATE_LIMIT_KEY.format(scope=scope, rule=rule.name, identity=identity)
+            entries.append((key, rule.limit, rule.window))
+
+        result = await hit(entries)
+        if result.degraded:
+            record_decision(scope, "fail_open")
+        record_decision(scope, "allowed" if result.allowed else "limited")
+        if not result.allowed:
+            logger.warning(f"请求被限流: {scope}, {[key for key, _, _ in entries]}, {result.retry_after:.1f} 秒后重试")
+            raise APIException(
+                code=ErrorCode.TOO_MANY_REQUESTS,
+                message=ErrorMessages.TOO_MANY_REQUESTS,
+                data={"retry_after": result.retry_after}
+            )
+
+    return dependency
@@ -0,0 +1,49 @@
+from typing import Optional
+import orjson
+from fastapi import Response
+from app.models.schemas.common import ErrorCode
+
+
+def success_json_response(data_json: bytes, msg: str = "success") -> Response:
+    """使用已序列化的数据构造成功响应
+    
+    响应格式与 ResponseModel.success 一致，data 部分直接拼接，
+    适用于缓存中取出的 JSON，避免重建对象与再次校验
+    
+    Args:
+        data_json: 已序列化的 data 部分 JSON
+        msg: 响应消息
+        
+    Returns:
+        Response: JSON 响应
+    """
+    body = b"".join((
+        b'{"code":', str(ErrorCode.SUCCESS).encode(),
+        b',"msg":', orjson.dumps(msg),
+        b',"data":', data_json,
+        b"}",
+    ))
+    return Response(content=body, media_type="application/json")
+
+
+def page_json_response(data_json: bytes, next_cursor: Optional[str], msg: str = "success") -> Response:
+    """使用已序列化的列表数据构造游标分页响应
+    
+    响应格式与 PageResponseModel 一致
+    
+    Args:
+        data_json: 已序列化的 data 部分 JSON
+        next_cursor: 下一页游标，没有下一页时为 None
+        msg: 响应消息
+        
+    Returns:
+        Response: JSON 响应
+    """
+    body = b"".join((
+        b'{"code":', str(ErrorCode.SUCCESS).encode(),
+        b',"msg":', orjson.dumps(msg),
+        b',"data":', data_json,
+        b',"next_cursor":', orjson.dumps(next_cursor),
+        b"}",
+    ))
+    return Response(content=body, media_type="application/json")
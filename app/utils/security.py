@@ -1,12 +1,16 @@
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional, TYPE_CHECKING
-from jose import jwt, JWTError
+from typing import Any, Dict, Tuple, Union, Optional, TYPE_CHECKING
+from jose import jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.db.base import get_db
+from app.models.schemas.token import TokenPayload
+from app.utils.cache import LocalCache
 
 # 避免循环导入
 if TYPE_CHECKING:
@@ -16,16 +20,47 @@ if TYPE_CHECKING:
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 # 创建密码上下文，使用 bcrypt 算法
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 成本因子由配置决定，已存储的哈希成本或算法与之不同时视为需要重新哈希
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_HASH_ROUNDS,
+)
+
+# 已解码令牌缓存：令牌 SHA-256 摘要 -> TokenPayload，条目在令牌过期时失效
+# 同步依赖运行在线程池中，访问需加锁
+token_cache = LocalCache(settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_token_cache_lock = threading.Lock()
+
+@dataclass(frozen=True)
+class Principal:
+    """已认证的身份
+    
+    属性:
+        user_id: 用户ID
+        is_active: 是否激活
+        is_superuser: 是否超级管理员
+        permission_mask: 有效权限位掩码
+        authz_version: 授权版本号
+    """
+    user_id: int
+    is_active: bool
+    is_superuser: bool
+    permission_mask: int
+    authz_version: Optional[str] = None
+
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any], expires_delta: timedelta = None, claims: Optional[Dict[str, Any]] = None
 ) -> str:
     """创建访问令牌
 
     Args:
         subject: 令牌主题（通常是用户ID）
         expires_delta: 过期时间增量，如果不指定则使用默认配置
+        claims: 额外的声明，如权限位掩码与授权版本号
 
     Returns:
         str: JWT令牌字符串
@@ -36,12 +71,60 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
 
+def decode_access_token(token: str) -> TokenPayload:
+    """解码并校验访问令牌
+
+    Args:
+        token: JWT令牌
+
+    Returns:
+        TokenPayload: 令牌载荷
+
+    Raises:
+        JWTError: 令牌无效或已过期
+        ValidationError: 载荷格式无效
+    """
+    if not settings.TOKEN_CACHE_ENABLED:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        return TokenPayload(**payload)
+    
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    with _token_cache_lock:
+        token_data = token_cache.get(digest, None)
+    if token_data is not None:
+        return token_data
+    
+    payload = jwt.decode(
+        token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+    token_data = TokenPayload(**payload)
+    
+    # 只缓存带过期时间的令牌，缓存时间不超过令牌剩余有效期
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = float(exp) - time.time()
+        if ttl > 0:
+            with _token_cache_lock:
+                token_cache.set(digest, token_data, ttl)
+    return token_data
+
+def get_token_cache_stats() -> Dict[str, int]:
+    """获取已解码令牌缓存的统计信息
+
+    Returns:
+        Dict[str, int]: 命中数、未命中数与当前条目数
+    """
+    with _token_cache_lock:
+        return {"hits": token_cache.hits, "misses": token_cache.misses, "size": len(token_cache)}
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码
 
@@ -54,6 +137,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """验证密码，并在存储的哈希需要升级时返回新哈希
+
+    Args:
+        plain_password: 明文密码
+        hashed_password: 哈希后的密码
+
+    Returns:
+        Tuple[bool, Optional[str]]: 密码是否匹配，以及需要替换的新哈希（无需替换时为 None）
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """获取密码的哈希值
 
@@ -66,12 +161,14 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 async def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    request: Request, token: str = Depends(oauth2_scheme)
 ) -> "User":
     """获取当前用户
 
+    复用请求级的身份解析结果，同一请求内令牌只解码一次、数据库最多查询一次
+
     Args:
-        db: 数据库会话
+        request: 当前请求
         token: JWT令牌
 
     Returns:
@@ -80,27 +177,17 @@ async def get_current_user(
     Raises:
         HTTPException: 如果令牌无效或用户不存在
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无效的认证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    # 延迟导入User模型，避免循环导入
-    from app.models.domain.user import User
-    
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    # 延迟导入，避免循环导入
+    from app.utils.permissions import load_principal_user, resolve_principal
+
+    principal = await resolve_principal(request, token)
+    user = await load_principal_user(request, principal)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的认证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     return user
 
@@ -0,0 +1,271 @@
+"""
+缓存值编解码
+
+缓存值以固定长度的头部开始，头部记录编解码器、压缩算法与新鲜期截止时间，
+读取时根据头部一次完成解码，无需逐个尝试不同的反序列化方式
+"""
+import math
+from abc import ABC, abstractmethod
+import pickle
+import struct
+import logging
+from typing import Any, Dict, Optional, Tuple
+import orjson
+import msgpack
+from pydantic import BaseModel
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # 可选依赖
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# 头部: 魔数(1B) 编解码器(1B) 压缩算法(1B) 标志位(1B) 新鲜期截止时间(8B)
+HEADER = struct.Struct(">BBBBd")
+MAGIC = 0xCA
+
+# 标志位
+FLAG_NONE = 0x01  # 缓存值为 None，无负载
+
+
+class CodecError(ValueError):
+    """缓存值编解码失败"""
+
+
+def _default(value: Any) -> Any:
+    """JSON/MessagePack 无法直接序列化的类型"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"无法序列化类型: {type(value).__name__}")
+
+
+class Codec(ABC):
+    """编解码器基类
+    
+    属性:
+        name: 编解码器名称，用于配置
+        tag: 写入头部的编号，一经分配不可修改
+    """
+    name: str = ""
+    tag: int = 0
+    
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        """将值序列化为字节串"""
+    
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """将字节串反序列化为值"""
+
+
+class PickleCodec(Codec):
+    """Pickle 编解码器，支持任意 Python 对象"""
+    name = "pickle"
+    tag = 1
+    
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class JSONCodec(Codec):
+    """JSON 编解码器（orjson），适用于字典、列表等基础类型"""
+    name = "json"
+    tag = 2
+    
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=_default)
+    
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """MessagePack 编解码器，体积比 JSON 更小"""
+    name = "msgpack"
+    tag = 3
+    
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=_default, use_bin_type=True)
+    
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class BytesCodec(Codec):
+    """原样存储字节串，适用于已序列化的数据（如预先生成的 JSON）"""
+    name = "bytes"
+    tag = 4
+    
+    def dumps(self, value: bytes) -> bytes:
+        if not isinstance(value, (bytes, bytearray)):
+            raise TypeError(f"bytes 编解码器只接受字节串: {type(value).__name__}")
+        return bytes(value)
+    
+    def loads(self, data: bytes) -> bytes:
+        return data
+
+
+class Compressor(ABC):
+    """压缩算法基类"""
+    name: str = ""
+    tag: int = 0
+    
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """压缩字节串"""
+    
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """解压字节串"""
+
+
+class ZstdCompressor(Compressor):
+    """zstd 压缩（需要安装 zstandard）"""
+    name = "zstd"
+    tag = 1
+    
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+    
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class LZ4Compressor(Compressor):
+    """lz4 压缩（需要安装 lz4）"""
+    name = "lz4"
+    tag = 2
+    
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data)
+    
+    def decompress(self, data: bytes) -> bytes:
+        return lz4_frame.decompress(data)
+
+
+_codecs_by_name: Dict[str, Codec] = {}
+_codecs_by_tag: Dict[int, Codec] = {}
+_compressors_by_name: Dict[str, Compressor] = {}
+_compressors_by_tag: Dict[int, Compressor] = {}
+
+
+def register_codec(codec: Codec) -> None:
+    """注册编解码器"""
+    existing = _codecs_by_tag.get(codec.tag)
+    if existing is not None and existing.name != codec.name:
+        raise ValueError(f"编解码器编号冲突: {codec.tag} ({existing.name}, {codec.name})")
+    _codecs_by_name[codec.name] = codec
+    _codecs_by_tag[codec.tag] = codec
+
+
+def register_compressor(compressor: Compressor) -> None:
+    """注册压缩算法"""
+    _compressors_by_name[compressor.name] = compressor
+    _compressors_by_tag[compressor.tag] = compressor
+
+
+def get_codec(name: str) -> Codec:
+    """按名称获取编解码器"""
+    try:
+        return _codecs_by_name[name]
+    except KeyError:
+        raise ValueError(f"未知的缓存编解码器: {name}") from None
+
+
+def get_compressor(name: Optional[str]) -> Optional[Compressor]:
+    """按名称获取压缩算法，"none" 或空值表示不压缩；依赖未安装时返回 None"""
+    if not name or name == "none":
+        return None
+    compressor = _compressors_by_name.get(name)
+    if compressor is None:
+        logger.warning(f"压缩算法 {name} 不可用（未知或依赖未安装），将不压缩缓存值")
+    return compressor
+
+
+for _codec in (PickleCodec(), JSONCodec(), MsgpackCodec(), BytesCodec()):
+    register_codec(_codec)
+if zstandard is not None:
+    register_compressor(ZstdCompressor())
+if lz4_frame is not None:
+    register_compressor(LZ4Compressor())
+
+
+def encode(
+    value: Any,
+    codec: Codec,
+    fresh_until: Optional[float] = None,
+    compressor: Optional[Compressor] = None,
+    compress_threshold: int = 1024,
+) -> bytes:
+    """编码缓存值
+    
+    Args:
+        value: 缓存值
+        codec: 编解码器
+        fresh_until: 新鲜期截止时间（时间戳），None 表示始终新鲜
+        compressor: 压缩算法，None 表示不压缩
+        compress_threshold: 负载超过该字节数时才压缩
+        
+    Returns:
+        bytes: 头部 + 负载
+    """
+    flags = 0
+    compression = 0
+    if value is None:
+        flags |= FLAG_NONE
+        payload = b""
+    else:
+        payload = codec.dumps(value)
+        if compressor is not None and len(payload) > compress_threshold:
+            payload = compressor.compress(payload)
+            compression = compressor.tag
+    header = HEADER.pack(MAGIC, codec.tag, compression, flags, fresh_until if fresh_until is not None else math.nan)
+    return header + payload
+
+
+def decode(data: bytes) -> Tuple[Optional[float], Any]:
+    """解码缓存值
+    
+    Args:
+        data: encode 生成的字节串
+        
+    Returns:
+        Tuple[Optional[float], Any]: (新鲜期截止时间, 缓存值)
+        
+    Raises:
+        CodecError: 数据格式无效或编解码器/压缩算法不可用
+    """
+    if len(data) < HEADER.size:
+        raise CodecError("缓存数据长度不足")
+    magic, codec_tag, compression, flags, fresh_until = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CodecError("缓存数据头部无效")
+    fresh_until = None if math.isnan(fresh_until) else fresh_until
+    if flags & FLAG_NONE:
+        return fresh_until, None
+    
+    codec = _codecs_by_tag.get(codec_tag)
+    if codec is None:
+        raise CodecError(f"未知的编解码器编号: {codec_tag}")
+    payload = data[HEADER.size:]
+    if compression:
+        compressor = _compressors_by_tag.get(compression)
+        if compressor is None:
+            raise CodecError(f"压缩算法不可用: {compression}")
+        payload = compressor.decompress(payload)
+    return fresh_until, codec.loads(payload)
@@ -0,0 +1,35 @@
+"""Add permission bit
+
+Revision ID: 3f8b6d1c9a20
+Revises: 7a3c9e2d5b14
+Create Date: 2025-04-08 15:41:07.618230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8b6d1c9a20'
+down_revision: Union[str, None] = '7a3c9e2d5b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 权限位编号与自增主键解耦，已有权限按ID顺序从 0 开始连续编号
+    op.add_column('permission', sa.Column('bit', sa.Integer(), nullable=True))
+    permission = sa.table('permission', sa.column('id', sa.Integer), sa.column('bit', sa.Integer))
+    bind = op.get_bind()
+    ids = bind.execute(sa.select(permission.c.id).order_by(permission.c.id)).scalars().all()
+    for bit, permission_id in enumerate(ids):
+        bind.execute(permission.update().where(permission.c.id == permission_id).values(bit=bit))
+    op.alter_column('permission', 'bit', existing_type=sa.Integer(), nullable=False)
+    op.create_unique_constraint('uq_permission_bit', 'permission', ['bit'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_permission_bit', 'permission', type_='unique')
+    op.drop_column('permission', 'bit')
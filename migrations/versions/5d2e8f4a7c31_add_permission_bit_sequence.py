@@ -0,0 +1,36 @@
+"""Add permission bit sequence
+
+Revision ID: 5d2e8f4a7c31
+Revises: 3f8b6d1c9a20
+Create Date: 2025-04-10 09:27:44.381905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8f4a7c31'
+down_revision: Union[str, None] = '3f8b6d1c9a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 权限位编号改为单调分配，序列从已有最大编号之后开始
+    sequence = op.create_table(
+        'permission_bit_sequence',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('next_bit', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    permission = sa.table('permission', sa.column('bit', sa.Integer))
+    bind = op.get_bind()
+    max_bit = bind.execute(sa.select(sa.func.max(permission.c.bit))).scalar()
+    op.bulk_insert(sequence, [{'id': 1, 'next_bit': max_bit + 1 if max_bit is not None else 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('permission_bit_sequence')
@@ -0,0 +1,51 @@
+"""Cascade association foreign keys
+
+Revision ID: 7a3c9e2d5b14
+Revises: 1cbe40d803e6
+Create Date: 2025-04-02 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3c9e2d5b14'
+down_revision: Union[str, None] = '1cbe40d803e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (关联表, 外键列, 被引用表, 新外键名)
+ASSOCIATION_FOREIGN_KEYS = [
+    ('role_permission', 'role_id', 'role', 'fk_role_permission_role_id_role'),
+    ('role_permission', 'permission_id', 'permission', 'fk_role_permission_permission_id_permission'),
+    ('user_role', 'user_id', 'users', 'fk_user_role_user_id_users'),
+    ('user_role', 'role_id', 'role', 'fk_user_role_role_id_role'),
+]
+
+
+def _drop_foreign_key(table: str, column: str) -> None:
+    """删除指定列上的外键
+
+    初始迁移中的外键未命名，名称由数据库生成，因此需要先反射出实际名称
+    """
+    inspector = sa.inspect(op.get_bind())
+    for fk in inspector.get_foreign_keys(table):
+        if fk['constrained_columns'] == [column] and fk.get('name'):
+            op.drop_constraint(fk['name'], table, type_='foreignkey')
+
+
+def upgrade() -> None:
+    # 关联表外键改为 ON DELETE CASCADE，删除角色、权限或用户时由数据库清理关联行
+    for table, column, referent, name in ASSOCIATION_FOREIGN_KEYS:
+        _drop_foreign_key(table, column)
+        op.create_foreign_key(name, table, referent, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    for table, column, referent, name in ASSOCIATION_FOREIGN_KEYS:
+        _drop_foreign_key(table, column)
+        op.create_foreign_key(name, table, referent, [column], ['id'])